@@ -0,0 +1,89 @@
+from sqlmodel import Session, select
+from sqlalchemy.orm import joinedload, contains_eager
+from cachetools import TTLCache
+from collections import Counter
+from dotenv import load_dotenv
+from .database import Build, Part, User, BuildPartLink
+from .models import BuildResponse, BuildDetailResponse, PartResponse, PartCategoryResponse
+import threading
+import os
+
+load_dotenv()
+
+BUILD_DETAIL_CACHE_SIZE = int(os.getenv("BUILD_DETAIL_CACHE_SIZE", "1024"))
+# Bounds staleness from changes that do not bump the build version, such as
+# edits to a part's catalogue entry or the owner's profile
+BUILD_DETAIL_CACHE_TTL_SECONDS = float(os.getenv("BUILD_DETAIL_CACHE_TTL_SECONDS", "300"))
+
+# Serialized build details keyed by (build_id, version)
+build_detail_cache = TTLCache(maxsize=BUILD_DETAIL_CACHE_SIZE, ttl=BUILD_DETAIL_CACHE_TTL_SECONDS)
+build_detail_cache_lock = threading.Lock()
+
+def bump_build_version(build: Build):
+    # Evaluated in SQL so concurrent edits never produce the same version
+    build.version = Build.version + 1
+
+def get_build_version(session: Session, build_id: int) -> int | None:
+    return session.exec(
+        select(Build.version)
+        # Joining the owner leaves out builds of deleted accounts
+        .join(User, Build.user_id == User.id)
+        .where(Build.id == build_id)
+    ).first()
+
+def load_build_detail(session: Session, build_id: int) -> dict | None:
+    build = session.exec(
+        select(Build)
+        .join(User, Build.user_id == User.id)
+        .where(Build.id == build_id)
+        .options(contains_eager(Build.owner), joinedload(Build.vehicle))
+    ).first()
+
+    if build is None:
+        return None
+
+    parts = session.exec(
+        select(Part)
+        .join(BuildPartLink, BuildPartLink.part_id == Part.id)
+        .where(BuildPartLink.build_id == build_id)
+        .options(
+            joinedload(Part.submitted_by), joinedload(Part.brand), joinedload(Part.part_type)
+        )
+        .order_by(Part.id)
+    ).unique().all()
+
+    category_counts = Counter(part.part_type.type for part in parts)
+    part_categories = [PartCategoryResponse(name="All", count=len(parts))] + [
+        PartCategoryResponse(name=name, count=count)
+        for name, count in sorted(category_counts.items())
+    ]
+
+    detail = BuildDetailResponse(
+        **BuildResponse.model_validate(build, from_attributes=True).model_dump(),
+        parts=[PartResponse.model_validate(part, from_attributes=True) for part in parts],
+        version=build.version,
+        part_categories=part_categories,
+    )
+
+    return detail.model_dump(mode="json")
+
+def get_build_detail(session: Session, build_id: int) -> dict | None:
+    """
+    Build, owner, vehicle, parts and category counts for a build page. Only the
+    build's version is read when the assembled payload is already cached.
+    """
+    version = get_build_version(session, build_id)
+    if version is None:
+        return None
+
+    with build_detail_cache_lock:
+        detail = build_detail_cache.get((build_id, version))
+    if detail is not None:
+        return detail
+
+    detail = load_build_detail(session, build_id)
+    if detail is not None:
+        with build_detail_cache_lock:
+            build_detail_cache[(build_id, detail["version"])] = detail
+
+    return detail
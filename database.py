@@ -2,16 +2,20 @@ from sqlmodel import (
     Field, Session, SQLModel, create_engine, select, Relationship,
     UniqueConstraint
 )
-from sqlalchemy import text
+from sqlalchemy import text, Column, JSON, Index, event
+from sqlalchemy.orm import with_loader_criteria, ORMExecuteState
 from sqlalchemy.exc import IntegrityError
 import os
 import csv
+import io
+import time
+import hashlib
 from dotenv import load_dotenv
+from .http_client import open_text_source, download_if_modified
 from pydantic import EmailStr
 from datetime import datetime, timezone 
-from typing import Optional
-import requests
-import io
+from typing import Optional, Iterable, Iterator
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 import re
 
 load_dotenv()
@@ -26,13 +30,27 @@ class User(SQLModel, table=True):
     bio: str = Field(default="")
     profile_pic_url: str = Field(default="https://i.imgur.com/L5AoglL.png")
 
-    posts: list["Post"] = Relationship(back_populates="user")
-    comments: list["Comment"] = Relationship(back_populates="user")
-    likes: list["Like"] = Relationship(back_populates="user")
-    builds: list["Build"] = Relationship(back_populates="owner")
-    part_submissions: list["Part"] = Relationship(back_populates="submitted_by")
-    following: list["Follow"] = Relationship(back_populates="follower", sa_relationship_kwargs={"foreign_keys": "[Follow.follower_id]"})
-    followers: list["Follow"] = Relationship(back_populates="following", sa_relationship_kwargs={"foreign_keys": "[Follow.following_id]"})
+    # Maintained by database triggers, see migrations.py
+    follower_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    following_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    post_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    # Set when the account is deleted; the purge worker removes the row later
+    deleted_at: datetime | None = Field(default=None)
+
+    # Rows owned by a user are removed by ON DELETE CASCADE foreign keys, so the
+    # ORM never loads these collections just to delete them
+    posts: list["Post"] = Relationship(back_populates="user", passive_deletes="all")
+    comments: list["Comment"] = Relationship(back_populates="user", passive_deletes="all")
+    likes: list["Like"] = Relationship(back_populates="user", passive_deletes="all")
+    builds: list["Build"] = Relationship(back_populates="owner", passive_deletes="all")
+    # Parts outlive their submitter; the foreign key sets submitted_by_id to NULL
+    part_submissions: list["Part"] = Relationship(back_populates="submitted_by", passive_deletes="all")
+    following: list["Follow"] = Relationship(back_populates="follower", passive_deletes="all", sa_relationship_kwargs={"foreign_keys": "[Follow.follower_id]"})
+    followers: list["Follow"] = Relationship(back_populates="following", passive_deletes="all", sa_relationship_kwargs={"foreign_keys": "[Follow.following_id]"})
+
+    __table_args__ = (
+        Index("ix_user_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL")),
+    )
 
 class Post(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
@@ -41,17 +59,27 @@ class Post(SQLModel, table=True):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     edited_at: datetime | None = Field(default=None)
 
+    # Maintained by database triggers, see migrations.py
+    like_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    comment_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    # Set when the post is deleted; the purge worker removes the row later
+    deleted_at: datetime | None = Field(default=None)
+
     # Every post must come from a user, so can't be none
-    user_id: int = Field(foreign_key="user.id")
+    user_id: int = Field(foreign_key="user.id", ondelete="CASCADE", index=True)
     user: User = Relationship(back_populates="posts")
 
     # Display Likes and Comments
-    comments: list["Comment"] = Relationship(back_populates="post")
-    likes: list["Like"] = Relationship(back_populates="post")
+    comments: list["Comment"] = Relationship(back_populates="post", passive_deletes="all")
+    likes: list["Like"] = Relationship(back_populates="post", passive_deletes="all")
+
+    __table_args__ = (
+        Index("ix_post_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL")),
+    )
 
 class Like(SQLModel, table=True):
-    post_id: int = Field(default=None, foreign_key="post.id", primary_key=True)
-    user_id: int = Field(default=None, foreign_key="user.id", primary_key=True)
+    post_id: int = Field(default=None, foreign_key="post.id", ondelete="CASCADE", primary_key=True)
+    user_id: int = Field(default=None, foreign_key="user.id", ondelete="CASCADE", primary_key=True, index=True)
     liked_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     user: User = Relationship(back_populates="likes")
@@ -59,8 +87,8 @@ class Like(SQLModel, table=True):
 
 class Comment(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
-    post_id: int = Field(foreign_key="post.id")
-    user_id: int = Field(foreign_key="user.id")
+    post_id: int = Field(foreign_key="post.id", ondelete="CASCADE", index=True)
+    user_id: int = Field(foreign_key="user.id", ondelete="CASCADE", index=True)
     comment: str
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -80,8 +108,8 @@ class Vehicle(SQLModel, table=True):
     )
 
 class Follow(SQLModel, table=True):
-    follower_id: int = Field(foreign_key="user.id", primary_key=True)
-    following_id: int = Field(foreign_key="user.id", primary_key=True)
+    follower_id: int = Field(foreign_key="user.id", ondelete="CASCADE", primary_key=True)
+    following_id: int = Field(foreign_key="user.id", ondelete="CASCADE", primary_key=True, index=True)
     followed_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     follower: User = Relationship(back_populates="following", sa_relationship_kwargs={"foreign_keys": "[Follow.follower_id]"})
@@ -89,20 +117,22 @@ class Follow(SQLModel, table=True):
 
 # Create many-to-many relationship between Parts and Builds tables
 class BuildPartLink(SQLModel, table=True):
-    build_id: int = Field(default=None, foreign_key="build.id", primary_key=True)
-    part_id: int = Field(default=None, foreign_key="part.id", primary_key=True)
+    build_id: int = Field(default=None, foreign_key="build.id", ondelete="CASCADE", primary_key=True)
+    part_id: int = Field(default=None, foreign_key="part.id", ondelete="CASCADE", primary_key=True, index=True)
 
 class Build(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
-    user_id: int = Field(foreign_key="user.id")
+    user_id: int = Field(foreign_key="user.id", ondelete="CASCADE", index=True)
     vehicle_id: int = Field(foreign_key="vehicle.id")
     nickname: str | None = Field(default=None)
     cover_picture_url: str | None = Field(default="https://i.imgur.com/wfqeko6.png")
     description: str | None = Field(default=None)
+    # Bumped on every change to the build or its parts; keys the detail cache
+    version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
     
     owner: User = Relationship(back_populates="builds")
     vehicle: Vehicle = Relationship(back_populates="builds")
-    parts: list["Part"] = Relationship(back_populates="builds", link_model=BuildPartLink)
+    parts: list["Part"] = Relationship(back_populates="builds", link_model=BuildPartLink, passive_deletes=True)
 
 class PartType(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
@@ -121,7 +151,7 @@ class Brand(SQLModel, table=True):
 class Part(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
     brand_id: int = Field(foreign_key="brand.id")
-    submitted_by_id: int = Field(foreign_key="user.id")
+    submitted_by_id: int | None = Field(default=None, foreign_key="user.id", ondelete="SET NULL", index=True)
     type_id: int = Field(foreign_key="parttype.id")
     part_name: str = Field(index=True)
     part_number: str | None = Field(default=None)
@@ -129,11 +159,111 @@ class Part(SQLModel, table=True):
     description: str | None = Field(default=None)
     is_verified: bool = Field(default=False) # for admin/mods to finalize image, brand, number, etc
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Product page the part was scraped from, stored normalized for lookups
+    source_url: str | None = Field(default=None, index=True)
+    # Kept in sync with part_number by the listener below
+    part_number_normalized: str | None = Field(default=None)
 
     brand: Brand = Relationship(back_populates="parts")
-    builds: list["Build"] = Relationship(back_populates="parts", link_model=BuildPartLink)
+    builds: list["Build"] = Relationship(back_populates="parts", link_model=BuildPartLink, passive_deletes=True)
     part_type: PartType = Relationship(back_populates="parts")
-    submitted_by: User = Relationship(back_populates="part_submissions")
+    submitted_by: User | None = Relationship(back_populates="part_submissions")
+
+    __table_args__ = (
+        Index("ix_part_brand_id_part_number_normalized", "brand_id", "part_number_normalized"),
+    )
+
+# Popularity rollups, maintained by database triggers on build and buildpartlink
+# (see migrations.py) and periodically rebuilt by rollups.py
+class VehiclePartCount(SQLModel, table=True):
+    vehicle_id: int = Field(foreign_key="vehicle.id", ondelete="CASCADE", primary_key=True)
+    part_id: int = Field(foreign_key="part.id", ondelete="CASCADE", primary_key=True)
+    build_count: int = Field(default=0)
+
+    __table_args__ = (
+        Index("ix_vehiclepartcount_vehicle_id_build_count", "vehicle_id", "build_count", "part_id"),
+    )
+
+class PartBuildCount(SQLModel, table=True):
+    part_id: int = Field(foreign_key="part.id", ondelete="CASCADE", primary_key=True)
+    build_count: int = Field(default=0)
+
+    __table_args__ = (
+        Index("ix_partbuildcount_build_count", "build_count", "part_id"),
+    )
+
+class VehicleBuildCount(SQLModel, table=True):
+    vehicle_id: int = Field(foreign_key="vehicle.id", ondelete="CASCADE", primary_key=True)
+    build_count: int = Field(default=0)
+
+    __table_args__ = (
+        Index("ix_vehiclebuildcount_build_count", "build_count", "vehicle_id"),
+    )
+
+# Top co-occurring parts per part, written by related_parts.py
+class RelatedPart(SQLModel, table=True):
+    part_id: int = Field(foreign_key="part.id", ondelete="CASCADE", primary_key=True)
+    related_part_id: int = Field(foreign_key="part.id", ondelete="CASCADE", primary_key=True, index=True)
+    # Builds that have both parts installed
+    co_builds: int
+    score: float
+
+# Parts whose co-occurrences changed since the last related parts run. Filled
+# by triggers on buildpartlink; no foreign key so deleted parts can be queued
+class RelatedPartDirty(SQLModel, table=True):
+    part_id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+
+# When each build was last created, re-versioned or deleted, in UTC. Filled by
+# a trigger on build and read by the similar builds sync; no foreign key so
+# deletions are kept
+class BuildChange(SQLModel, table=True):
+    build_id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    changed_at: datetime = Field(index=True)
+
+def normalize_part_number(part_number: str | None) -> str | None:
+    if not part_number:
+        return None
+
+    # Case- and punctuation-insensitive, e.g. "ABC-123.4" and "abc 1234" match
+    normalized = re.sub(r"[^a-z0-9]", "", part_number.lower())
+    return normalized or None
+
+@event.listens_for(Part, "before_insert")
+@event.listens_for(Part, "before_update")
+def set_part_number_normalized(mapper, connection, part):
+    part.part_number_normalized = normalize_part_number(part.part_number)
+
+TRACKING_QUERY_PARAMS = ("gclid", "fbclid", "msclkid", "ref", "srsltid")
+
+def normalize_source_url(url: str | None) -> str | None:
+    if not url:
+        return None
+
+    scheme, netloc, path, query, _ = urlsplit(url.strip())
+    query_params = sorted(
+        (key, value) for key, value in parse_qsl(query)
+        if not key.startswith("utm_") and key not in TRACKING_QUERY_PARAMS
+    )
+    path = path.rstrip("/") or "/"
+
+    return urlunsplit((scheme.lower(), netloc.lower(), path, urlencode(query_params), ""))
+
+# Selectors learned from a successful Gemini extraction on a vendor domain
+class DomainExtractor(SQLModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    domain: str = Field(index=True, unique=True)
+    selectors: dict = Field(default_factory=dict, sa_column=Column(JSON))
+    hits: int = Field(default=0)
+    failures: int = Field(default=0)
+    learned_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+# Validators of the last successfully merged copy of each dataset source. Kept
+# in the database rather than next to the download cache, so a new or reset
+# database is always synced in full
+class DatasetSync(SQLModel, table=True):
+    source: str = Field(primary_key=True)
+    validators: dict = Field(default_factory=dict, sa_column=Column(JSON))
+    synced_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 PSQL_URI = os.getenv("PSQL_URI")
 
@@ -142,6 +272,23 @@ if not PSQL_URI:
 
 engine = create_engine(PSQL_URI)
 
+@event.listens_for(Session, "do_orm_execute")
+def hide_tombstoned_rows(execute_state: ORMExecuteState):
+    """
+    Leave deleted users and posts out of every ORM select, including
+    relationship loads. Pass execution_options(include_deleted=True) to see them.
+    """
+    if (
+        execute_state.is_select
+        and not execute_state.is_column_load
+        and not execute_state.is_relationship_load
+        and not execute_state.execution_options.get("include_deleted", False)
+    ):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(User, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+            with_loader_criteria(Post, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+        )
+
 # Create the models for all models defined above
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
@@ -150,31 +297,7 @@ def slugify(name: str) -> str:
     return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
 
 def insert_brands_to_db(filename: str):
-    with Session(engine) as session:
-        existing_brand = session.exec(select(Brand)).first()
-        if existing_brand:
-            print("Brand table already populated. Skipping brand insertions")
-            return
-
-    print("Brand table is empty. Populating from CSV...")
-    if filename.startswith("http"):
-        response = requests.get(filename)
-        response.raise_for_status() 
-        file_content = io.StringIO(response.text)
-    else:
-        file_content = open(filename, newline="r", encoding="utf-8")  # Open local file
-
-    with file_content as file:
-        brands_list = [line.strip() for line in file if line.strip()]
-    
-    with Session(engine) as session:
-        for new_brand in brands_list:
-            slug = slugify(new_brand)
-            new_brand = Brand(name=new_brand, slug=slug)
-            session.add(new_brand)
-            session.commit()
-            session.refresh(new_brand)
-            print(f"{new_brand.name} added to the brand table")
+    sync_brands(filename)
 
 def convert_csv_to_db(filename: str):
     with Session(engine) as session:
@@ -185,40 +308,7 @@ def convert_csv_to_db(filename: str):
             return  
 
     print("Vehicles database is empty. Populating from CSV...")
-
-    if filename.startswith("http"):  # Check if it's a URL
-        response = requests.get(filename)
-        response.raise_for_status() 
-        file_content = io.StringIO(response.text)
-
-    else:
-        file_content = open(filename, newline="", encoding="utf-8")  # Open local file
-
-    with file_content as file:
-        cars = csv.DictReader(file)
-        with Session(engine) as session:
-            for row in cars:
-                if len(row) < 3:  # Ensure row has all required fields
-                    print(f"Skipping malformed row: {row}")
-                    continue
-                
-                try:
-                    # Create the Vehicle object
-                    vehicle = Vehicle(make=str(row['make']), model=str(row['model']), year=int(row['year']))
-                    session.add(vehicle)
-                    print(f"Adding vehicle to db: {vehicle}")
-
-                    # Try to commit the individual vehicle, handle integrity violation
-                    try:
-                        session.commit()
-                        print(f"Vehicle committed: {vehicle}")
-                    except IntegrityError as e:
-                        session.rollback()  # Rollback only for this specific row
-                        print(f"IntegrityError occurred for {vehicle}: {e.orig} - Skipping this row.")
-                except ValueError as e:
-                    print(f"Skipping Incorrect Row: {row}, Error: {e}")
-
-            print("CSV import complete.")
+    bulk_load_vehicles_from_csv(filename)
 
 def populate_part_types():
     types = [
@@ -253,68 +343,267 @@ def populate_part_types():
             print("Part types imported to tables.")
 
 def import_unique_vehicles_from_csv(filename: str):
+    sync_vehicles(filename)
+
+class LineIteratorReader:
+    """File-like adapter so psycopg2's COPY can pull lines from a generator."""
+
+    def __init__(self, lines: Iterator[str]):
+        self.lines = lines
+        self.buffer = ""
+
+    def read(self, size: int = -1) -> str:
+        chunks = [self.buffer]
+        buffered = len(self.buffer)
+
+        while size < 0 or buffered < size:
+            line = next(self.lines, None)
+            if line is None:
+                break
+            chunks.append(line)
+            buffered += len(line)
+
+        data = "".join(chunks)
+        if size < 0:
+            self.buffer = ""
+            return data
+
+        self.buffer = data[size:]
+        return data[:size]
+
+    def readline(self, size: int = -1) -> str:
+        if self.buffer:
+            line, self.buffer = self.buffer, ""
+            return line
+
+        return next(self.lines, "")
+
+def vehicle_rows_as_csv(rows: Iterable[dict], stats: dict) -> Iterator[str]:
+    """Validate DictReader rows and re-emit them as CSV lines of year, make, model."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    for row in rows:
+        try:
+            year = int(row["year"])
+            make = str(row["make"]).strip()
+            model = str(row["model"]).strip()
+        except (KeyError, TypeError, ValueError):
+            stats["skipped"] += 1
+            continue
+
+        if not make or not model:
+            stats["skipped"] += 1
+            continue
+
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow((year, make, model))
+        stats["rows"] += 1
+        yield buffer.getvalue()
+
+def copy_lines_to_table(cursor, table: str, columns: tuple[str, ...], lines: Iterator[str]):
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+        LineIteratorReader(lines)
+    )
+
+def copy_vehicle_rows(rows: Iterable[dict]) -> dict:
+    """
+    Stream vehicle rows into a temporary staging table with COPY and merge them
+    into the vehicle table in one statement. Duplicates, whether within the
+    file or already in the table, are skipped rather than failing the load.
+    """
+    stats = {"rows": 0, "skipped": 0, "inserted": 0}
+    start = time.perf_counter()
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(
+            "CREATE TEMP TABLE vehicle_staging (year integer, make varchar, model varchar) ON COMMIT DROP"
+        )
+        copy_lines_to_table(cursor, "vehicle_staging", ("year", "make", "model"), vehicle_rows_as_csv(rows, stats))
+        cursor.execute(
+            "INSERT INTO vehicle (year, make, model) "
+            "SELECT DISTINCT year, make, model FROM vehicle_staging "
+            "ON CONFLICT ON CONSTRAINT uix_year_make_model DO NOTHING"
+        )
+        stats["inserted"] = cursor.rowcount
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+def bulk_load_vehicles_from_csv(filename: str) -> dict:
+    with open_text_source(filename) as file:
+        stats = copy_vehicle_rows(csv.DictReader(file))
+
+    rows_per_second = stats["rows"] / stats["seconds"] if stats["seconds"] else 0
+    print(
+        f"Loaded {stats['rows']} vehicle rows in {stats['seconds']:.2f}s "
+        f"({rows_per_second:,.0f} rows/sec): {stats['inserted']} inserted, "
+        f"{stats['rows'] - stats['inserted']} already present, {stats['skipped']} malformed rows skipped"
+    )
+
+    return stats
+
+DATASET_CACHE_DIR = os.getenv(
+    "DATASET_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".dataset_cache")
+)
+
+def get_source_cache_path(source: str) -> str:
+    os.makedirs(DATASET_CACHE_DIR, exist_ok=True)
+
+    key = hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+    name = os.path.basename(urlsplit(source).path) or "source"
+
+    return os.path.join(DATASET_CACHE_DIR, f"{key}-{name}")
+
+def load_source_metadata(source: str) -> dict | None:
     with Session(engine) as session:
-        # Check if the Vehicles table has any records
-        existing_vehicle = session.exec(select(Vehicle)).first()
-        if existing_vehicle:
-            print("Vehicles database already populated. Skipping CSV import.")
-            return  
+        dataset_sync = session.get(DatasetSync, source)
+        return dataset_sync.validators if dataset_sync else None
+
+def fetch_source_if_changed(source: str, force: bool = False) -> tuple[str, dict | None]:
+    """
+    Return a local path for source and its new validators, or None as the
+    validators if it has not changed since it was last merged into this
+    database. Remote sources use a conditional GET against a cached copy;
+    local files are compared by modification time and size.
+    """
+    data_path = get_source_cache_path(source)
+    cached_metadata = None if force else load_source_metadata(source)
+
+    if not source.startswith("http"):
+        stat = os.stat(source)
+        metadata = {"mtime": stat.st_mtime, "size": stat.st_size}
+        return source, (None if metadata == cached_metadata else metadata)
+
+    # Without the cached copy a 304 would leave nothing to read
+    if cached_metadata and not os.path.exists(data_path):
+        cached_metadata = None
+
+    metadata = download_if_modified(
+        source,
+        data_path,
+        etag=cached_metadata.get("etag") if cached_metadata else None,
+        last_modified=cached_metadata.get("last_modified") if cached_metadata else None,
+    )
+    if metadata is None:
+        return data_path, None
 
-    print("Vehicles database is empty. Populating from CSV...")
+    # Servers without validators resend the same file, so compare contents too
+    with open(data_path, "rb") as file:
+        metadata["sha256"] = hashlib.file_digest(file, "sha256").hexdigest()
 
-    if filename.startswith("http"):  # Check if it's a URL
-        response = requests.get(filename)
-        response.raise_for_status() 
-        file_content = io.StringIO(response.text)
-
-    else:
-        file_content = open(filename, newline="", encoding="utf-8")  # Open local file
-
-    with file_content as file:
-        cars = csv.DictReader(file)
-        cars_count = 0
-        with Session(engine) as session:
-            for row in cars:
-                if len(row) < 3:  # Ensure row has all required fields
-                    print(f"Skipping malformed row: {row}")
-                    continue
-                
-                try:
-                    # Create the Vehicle object
-                    vehicle = Vehicle(make=str(row['make']), model=str(row['model']), year=int(row['year']))
-                    session.add(vehicle)
-                    cars_count += 1
-                    print(f"Adding vehicle to db: {vehicle}")
-
-                except ValueError as e:
-                    print(f"Skipping Incorrect Row: {row}, Error: {e}")
-
-            try:
-                session.commit()
-                print(f"{cars_count} vehicles committed: {vehicle}")
-            except IntegrityError as e:
-                session.rollback()  # Rollback only for this specific row
-                print(f"IntegrityError occurred for {vehicle}: {e.orig} - Skipping this row.")
-
-            print("CSV import complete.")
+    if cached_metadata and cached_metadata.get("sha256") == metadata["sha256"]:
+        save_source_metadata(source, metadata)
+        return data_path, None
 
+    return data_path, metadata
+
+def save_source_metadata(source: str, metadata: dict):
+    # Only written after the rows are merged, so a failed sync is retried next time
     with Session(engine) as session:
-        db_types = session.exec(select(PartType)).all()
+        session.merge(DatasetSync(source=source, validators=metadata))
+        session.commit()
+
+def brand_rows_as_csv(lines: Iterable[str], stats: dict) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    for line in lines:
+        name = line.strip()
+        if not name:
+            continue
+
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow((name, slugify(name)))
+        stats["rows"] += 1
+        yield buffer.getvalue()
+
+def sync_brands(source: str, force: bool = False) -> dict | None:
+    """Insert brands from source that are missing from the brand table."""
+    path, metadata = fetch_source_if_changed(source, force)
+    if metadata is None:
+        print("Brands source unchanged since last sync. Skipping brand sync")
+        return None
+
+    stats = {"rows": 0, "inserted": 0}
+    start = time.perf_counter()
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("CREATE TEMP TABLE brand_staging (name varchar, slug varchar) ON COMMIT DROP")
+
+        with open(path, encoding="utf-8") as file:
+            copy_lines_to_table(cursor, "brand_staging", ("name", "slug"), brand_rows_as_csv(file, stats))
+
+        # Brands whose name or slug already exists are left untouched
+        cursor.execute(
+            "INSERT INTO brand (name, slug) "
+            "SELECT s.name, s.slug FROM brand_staging s "
+            "WHERE NOT EXISTS (SELECT 1 FROM brand b WHERE b.name = s.name OR b.slug = s.slug) "
+            "ON CONFLICT DO NOTHING"
+        )
+        stats["inserted"] = cursor.rowcount
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    save_source_metadata(source, metadata)
+    print(
+        f"Synced brands in {time.perf_counter() - start:.2f}s: "
+        f"{stats['inserted']} new of {stats['rows']} upstream"
+    )
 
-        if not db_types:
-            for type in db_types:
-                new_type = PartType(type=type) 
-                session.add(new_type)
-                session.commit()
-                session.refresh(new_type)
-                print(f"Part type {new_type} has been added")
-        else:
-            print("Part types table is already populated. Skipping type insertions")
+    return stats
+
+def sync_vehicles(source: str, force: bool = False) -> dict | None:
+    """Insert vehicles from source that are missing from the vehicle table."""
+    path, metadata = fetch_source_if_changed(source, force)
+    if metadata is None:
+        print("Vehicles source unchanged since last sync. Skipping vehicle sync")
+        return None
+
+    stats = bulk_load_vehicles_from_csv(path)
+    save_source_metadata(source, metadata)
+
+    return stats
 
 def get_db():
     with Session(engine) as session:
         yield session
 
+def check_database_ready():
+    """Fail fast if the database is unreachable or has not been bootstrapped."""
+    with Session(engine) as session:
+        session.exec(text("SELECT 1"))
+
+        missing_tables = [
+            table for table in SQLModel.metadata.tables
+            if session.exec(text("SELECT to_regclass(:table)").bindparams(table=f'"{table}"')).one()[0] is None
+        ]
+        if missing_tables:
+            raise RuntimeError(
+                f"Database is missing tables {missing_tables}. "
+                "Run `python -m ignition-link.manage bootstrap` first."
+            )
+
+        if not session.exec(select(PartType.id)).first():
+            print("Part types table is empty. Run `python -m ignition-link.manage bootstrap` to seed it.")
+
 def install_fuzzy_search_extension():
     with Session(engine) as session:
         print("Verifying installation for PSQL fuzzy search extension...")
@@ -2,12 +2,12 @@ from fastapi import Depends, HTTPException, status, Cookie
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.encoders import jsonable_encoder
 from .database import User, engine
+from .usernames import is_username_taken
 from sqlmodel import select, Session
 from sqlalchemy.exc import SQLAlchemyError
 from firebase_admin import auth, exceptions
 from typing import Annotated, Type
 from pydantic import BaseModel
-from google import genai
 from dotenv import load_dotenv
 import os
 
@@ -17,11 +17,8 @@ def get_session():
         yield session
 
 def check_username_exists(username_to_validate, session):
-    existing_user = session.exec(
-        select(User).where(User.username == username_to_validate)
-    ).first()
-
-    return bool(existing_user) 
+    # Names missing from the in-memory index are answered without a query
+    return is_username_taken(username_to_validate, session)
 
 # Used to return Pydantic model in JSONResponse
 def encode_model_to_json(model: BaseModel):
@@ -30,27 +27,26 @@ def encode_model_to_json(model: BaseModel):
 # OAuth2PasswordBearer will fetch the token from the "Authorization" header
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-async def verify_firebase_token(token: str = Depends(oauth2_scheme)):
+def verify_firebase_token(token: str = Depends(oauth2_scheme)) -> dict:
+    """Verify the Firebase ID token once and return its decoded claims."""
     try:
         # Decode and verify the token using Firebase Admin SDK
         decoded_token = auth.verify_id_token(token)
-        user_id = decoded_token['uid']
-        
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token is invalid or expired",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-
-        return token 
-
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Token verification failed: {str(e)}",
         )
 
+    if not decoded_token.get("uid"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token is invalid or expired",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return decoded_token
+
 # Dependency for verifying the session cookie
 async def verify_firebase_session_cookie(session: Annotated[str | None, Cookie()] = None):
     if not session:
@@ -80,15 +76,36 @@ async def verify_firebase_session_cookie(session: Annotated[str | None, Cookie()
             detail=f"Session cookie verification failed: {str(e)}",
         )
 
-def load_admin_emails():
-    try:
-        with open('admin_emails.txt', 'r') as file:
-            emails = file.read().splitlines()  # Read each line into a list
-            return emails
-    except FileNotFoundError:
-        return []  
-    except Exception as e:
-        return []  
+ADMIN_EMAILS_PATH = "admin_emails.txt"
+
+class AdminRoster:
+    """Admin emails from ADMIN_EMAILS_PATH, re-read only when the file changes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.emails: frozenset[str] = frozenset()
+        self.mtime: float | None = None
+
+    def get_emails(self) -> frozenset[str]:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            self.emails, self.mtime = frozenset(), None
+            return self.emails
+
+        if mtime != self.mtime:
+            with open(self.path, "r") as file:
+                self.emails = frozenset(
+                    line.strip().lower() for line in file if line.strip()
+                )
+            self.mtime = mtime
+
+        return self.emails
+
+    def is_admin(self, email: str | None) -> bool:
+        return bool(email) and email.lower() in self.get_emails()
+
+admin_roster = AdminRoster(ADMIN_EMAILS_PATH)
 
 def get_user_from_uid(firebase_uid, session):
     try:
@@ -128,6 +145,18 @@ def get_user_from_cookie(
 
     return user
 
+def verify_optional_session_cookie(session_cookie: str | None) -> str | None:
+    """Firebase uid of the signed-in user for pages that anonymous visitors can also see."""
+    if not session_cookie:
+        return None
+
+    try:
+        decoded_claims = auth.verify_session_cookie(session_cookie, check_revoked=True)
+    except (exceptions.FirebaseError, ValueError):
+        return None
+
+    return decoded_claims["uid"]
+
 def get_current_user_is_admin(
     current_user: Annotated[User, Depends(get_user_from_cookie)]
 ):
@@ -139,15 +168,6 @@ def get_current_user_is_admin(
             detail="Access denied: Admin privileges required"
         )
 
-def get_gemini_client():
-    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-    if not GEMINI_API_KEY:
-        raise RuntimeError("GEMINI_APIKEY is not set in environment variables")
-
-    client = genai.Client(api_key=GEMINI_API_KEY)
-
-    return client
-
 def check_resource_exists(session: Session, model: Type, resource_id: int, resource_name: str):
     resource = session.exec(
         select(model)
@@ -158,4 +178,6 @@ def check_resource_exists(session: Session, model: Type, resource_id: int, resou
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"{resource_name} not found."
-        )
\ No newline at end of file
+        )
+
+    return resource
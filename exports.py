@@ -0,0 +1,90 @@
+from sqlmodel import Session, select
+from datetime import datetime
+from typing import Iterator
+from .database import engine, User, Part, Build, Post
+import json
+import csv
+import io
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+# Output is handed to the response in chunks of about this size, since every
+# chunk of a sync generator costs a hop to the thread pool
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+# Flat columns exported per resource; relationships are exported as ids
+EXPORT_COLUMNS = {
+    "users": [
+        User.id, User.username, User.email, User.created_at, User.is_admin, User.bio,
+        User.profile_pic_url, User.follower_count, User.following_count, User.post_count,
+    ],
+    "parts": [
+        Part.id, Part.brand_id, Part.type_id, Part.submitted_by_id, Part.part_name,
+        Part.part_number, Part.image_url, Part.description, Part.is_verified, Part.created_at,
+        Part.source_url,
+    ],
+    "builds": [
+        Build.id, Build.user_id, Build.vehicle_id, Build.nickname, Build.cover_picture_url,
+        Build.description,
+    ],
+    "posts": [
+        Post.id, Post.user_id, Post.post_image_url, Post.caption, Post.created_at,
+        Post.edited_at, Post.like_count, Post.comment_count,
+    ],
+}
+
+def serialize_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+
+    return value
+
+def drain(buffer: io.StringIO) -> str:
+    chunk = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    return chunk
+
+def export_column_names(resource: str) -> list[str]:
+    return [column.key for column in EXPORT_COLUMNS[resource]]
+
+def iter_export_rows(resource: str) -> Iterator[tuple]:
+    columns = EXPORT_COLUMNS[resource]
+
+    # The request's session is closed before a streaming body finishes, so the
+    # export holds its own for as long as the cursor is open
+    with Session(engine) as session:
+        rows = session.exec(
+            select(*columns)
+            .order_by(columns[0])
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+
+        yield from rows
+
+def export_ndjson(resource: str) -> Iterator[str]:
+    buffer = io.StringIO()
+    names = export_column_names(resource)
+
+    for row in iter_export_rows(resource):
+        buffer.write(json.dumps({name: serialize_value(value) for name, value in zip(names, row)}))
+        buffer.write("\n")
+
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield drain(buffer)
+
+    yield drain(buffer)
+
+def export_csv(resource: str) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(export_column_names(resource))
+
+    for row in iter_export_rows(resource):
+        writer.writerow([serialize_value(value) for value in row])
+
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield drain(buffer)
+
+    yield drain(buffer)
@@ -0,0 +1,210 @@
+from sqlmodel import Session, select
+from datetime import datetime, timezone
+from urllib.parse import urljoin, urlsplit
+from .database import DomainExtractor
+from typing import TYPE_CHECKING
+import re
+
+# bs4 is imported inside the functions that parse pages to keep worker startup light
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup, Tag
+
+TEXT_FIELDS = ("brand", "part_name", "part_number", "description")
+REQUIRED_FIELDS = ("brand", "part_name")
+
+# Attributes that commonly hold product data outside of element text
+VALUE_ATTRIBUTES = ("content", "alt", "title", "data-brand", "data-sku")
+IMAGE_ATTRIBUTES = ("src", "data-src", "content", "href")
+
+# Gemini rewrites descriptions, so only their opening words are matched
+DESCRIPTION_MATCH_CHARS = 60
+MAX_SELECTOR_DEPTH = 8
+MAX_PART_NAME_LENGTH = 300
+
+def get_domain(url: str) -> str:
+    domain = (urlsplit(url).hostname or "").lower()
+    return domain.removeprefix("www.")
+
+def normalize_text(value: str | None) -> str:
+    return re.sub(r"\s+", " ", value or "").strip().lower()
+
+def element_text(element: "Tag") -> str:
+    return re.sub(r"\s+", " ", element.get_text(" ", strip=True)).strip()
+
+def is_css_identifier(value: str) -> bool:
+    return bool(re.fullmatch(r"[A-Za-z_-][\w-]*", value))
+
+def css_step(element: "Tag") -> str:
+    if element.get("id") and is_css_identifier(element["id"]):
+        return f"{element.name}#{element['id']}"
+
+    # Metadata tags are identified by what they describe, e.g. og:image
+    for attribute in ("property", "name", "itemprop"):
+        if element.name == "meta" and element.get(attribute):
+            return f'meta[{attribute}="{element[attribute]}"]'
+
+    step = element.name
+    classes = [c for c in element.get("class", []) if is_css_identifier(c)]
+    if classes:
+        step += "".join(f".{c}" for c in classes)
+
+    siblings = [
+        sibling for sibling in element.parent.find_all(element.name, recursive=False)
+    ] if element.parent else []
+    if len(siblings) > 1:
+        step += f":nth-of-type({siblings.index(element) + 1})"
+
+    return step
+
+def build_selector(soup: "BeautifulSoup", element: "Tag") -> str | None:
+    """Shortest ancestor path of CSS steps that matches only this element."""
+    steps = []
+    current = element
+
+    while current is not None and current.name != "[document]" and len(steps) < MAX_SELECTOR_DEPTH:
+        steps.insert(0, css_step(current))
+        selector = " > ".join(steps)
+
+        try:
+            matches = soup.select(selector)
+            if len(matches) == 1 and matches[0] is element:
+                return selector
+        except Exception:
+            return None
+
+        current = current.parent
+
+    return None
+
+def find_text_match(soup: "BeautifulSoup", field: str, value: str) -> tuple["Tag", str | None] | None:
+    target = normalize_text(value)
+    if not target:
+        return None
+
+    if field == "description":
+        target = target[:DESCRIPTION_MATCH_CHARS]
+        matches = lambda text: target in normalize_text(text)
+    else:
+        matches = lambda text: normalize_text(text) == target
+
+    # Structured metadata such as og:title is the most stable source
+    for element in soup.find_all(True):
+        for attribute in VALUE_ATTRIBUTES:
+            if element.get(attribute) and matches(element[attribute]):
+                return element, attribute
+
+    # Otherwise take the innermost element whose text matches
+    best = None
+    for element in soup.find_all(True):
+        if element.name in ("script", "style", "head", "html", "body"):
+            continue
+
+        text = element_text(element)
+        if matches(text) and (best is None or len(text) <= len(element_text(best))):
+            best = element
+
+    return (best, None) if best is not None else None
+
+def find_image_match(soup: "BeautifulSoup", base_url: str, image_url: str) -> tuple["Tag", str] | None:
+    for element in soup.find_all(["img", "meta", "link", "source"]):
+        for attribute in IMAGE_ATTRIBUTES:
+            src = element.get(attribute)
+            if src and urljoin(base_url, src) == image_url:
+                return element, attribute
+
+    return None
+
+def learn_selectors(html: str, url: str, parsed: dict) -> dict:
+    """
+    Derive a CSS selector for every field of a successful extraction by
+    locating the extracted values in the page. Returns {} if the required
+    fields cannot be located.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    selectors = {}
+
+    for field in TEXT_FIELDS:
+        value = parsed.get(field)
+        match = find_text_match(soup, field, value) if isinstance(value, str) else None
+        if match:
+            element, attribute = match
+            selector = build_selector(soup, element)
+            if selector:
+                selectors[field] = {"css": selector, "attr": attribute}
+
+    image_url = parsed.get("image_url")
+    match = find_image_match(soup, url, image_url) if isinstance(image_url, str) else None
+    if match:
+        element, attribute = match
+        selector = build_selector(soup, element)
+        if selector:
+            selectors["image_url"] = {"css": selector, "attr": attribute}
+
+    if not all(field in selectors for field in REQUIRED_FIELDS):
+        return {}
+
+    return selectors
+
+def apply_selectors(html: str, url: str, selectors: dict) -> dict | None:
+    """Extract fields locally with stored selectors, or None if validation fails."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    parsed = {}
+
+    for field, selector in selectors.items():
+        element = soup.select_one(selector["css"])
+        if element is None:
+            parsed[field] = None
+            continue
+
+        if selector["attr"]:
+            value = element.get(selector["attr"])
+        else:
+            value = element_text(element)
+
+        if value and field == "image_url":
+            value = urljoin(url, value)
+
+        parsed[field] = value.strip() if value else None
+
+    if not all(parsed.get(field) for field in REQUIRED_FIELDS):
+        return None
+
+    if len(parsed["part_name"]) > MAX_PART_NAME_LENGTH:
+        return None
+
+    return parsed
+
+def get_domain_extractor(session: Session, url: str) -> DomainExtractor | None:
+    return session.exec(
+        select(DomainExtractor)
+        .where(DomainExtractor.domain == get_domain(url))
+    ).first()
+
+def record_extractor_result(session: Session, extractor: DomainExtractor, succeeded: bool):
+    if succeeded:
+        extractor.hits += 1
+    else:
+        extractor.failures += 1
+
+    session.add(extractor)
+    session.commit()
+
+def save_domain_extractor(session: Session, url: str, selectors: dict):
+    if not selectors:
+        print(f"Could not learn selectors for {get_domain(url)}")
+        return
+
+    extractor = get_domain_extractor(session, url)
+    if extractor is None:
+        extractor = DomainExtractor(domain=get_domain(url))
+
+    extractor.selectors = selectors
+    extractor.learned_at = datetime.now(timezone.utc)
+
+    session.add(extractor)
+    session.commit()
+    print(f"Learned selectors for {extractor.domain}: {sorted(selectors)}")
@@ -0,0 +1,230 @@
+from sqlmodel import Session, select
+from sqlalchemy import text
+from itertools import chain
+from collections import defaultdict
+from dotenv import load_dotenv
+from .database import engine, Follow
+import numpy as np
+import threading
+import time
+import os
+
+load_dotenv()
+
+# How often each worker rebuilds the graph from the follow table. Follows made
+# through other workers show up sooner for the viewer, see ensure_fresh
+FOLLOW_GRAPH_REFRESH_SECONDS = float(os.getenv("FOLLOW_GRAPH_REFRESH_SECONDS", "300"))
+# Most recent follows of the viewer whose own follows are counted for suggestions
+FOLLOW_SUGGESTION_MAX_FANOUT = int(os.getenv("FOLLOW_SUGGESTION_MAX_FANOUT", "500"))
+
+# Rows fetched per round trip when loading the follow table
+FOLLOW_FETCH_SIZE = 50_000
+
+class CSRAdjacency:
+    """
+    Neighbours of every user id packed into one array; user u's neighbours are
+    neighbours[indptr[u]:indptr[u + 1]], most recently followed first.
+    """
+
+    def __init__(self, sources: np.ndarray, targets: np.ndarray, followed_at: np.ndarray):
+        order = np.lexsort((-followed_at, sources))
+        size = int(sources.max()) + 1 if len(sources) else 0
+
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=size))))
+        self.neighbours = targets[order].astype(np.int32)
+
+    def row(self, user_id: int) -> np.ndarray:
+        if user_id + 1 >= len(self.indptr):
+            return self.neighbours[:0]
+
+        return self.neighbours[self.indptr[user_id]:self.indptr[user_id + 1]]
+
+class Overlay:
+    """Follows and unfollows made since the adjacency was loaded, for one direction."""
+
+    def __init__(self):
+        self.added: dict[int, list[int]] = defaultdict(list)
+        self.removed: dict[int, set[int]] = defaultdict(set)
+
+    def add(self, source: int, target: int):
+        self.removed[source].discard(target)
+        if target not in self.added[source]:
+            self.added[source].append(target)
+
+    def remove(self, source: int, target: int):
+        if target in self.added[source]:
+            self.added[source].remove(target)
+        self.removed[source].add(target)
+
+    def apply(self, user_id: int, base: np.ndarray) -> np.ndarray:
+        added = self.added.get(user_id)
+        removed = self.removed.get(user_id)
+        if not added and not removed:
+            return base
+
+        hidden = list((removed or set()) | set(added or []))
+        kept = base[~np.isin(base, hidden)]
+
+        return np.concatenate((np.array(added[::-1] if added else [], dtype=np.int32), kept))
+
+class FollowGraph:
+    """
+    In-memory follow graph: CSR adjacency for following and followers,
+    loaded from the follow table, plus an overlay of the changes made
+    through this worker since the load.
+    """
+
+    def __init__(self):
+        empty = np.array([], dtype=np.int64)
+        self.following_base = CSRAdjacency(empty, empty, empty)
+        self.followers_base = CSRAdjacency(empty, empty, empty)
+        self.following_overlay = Overlay()
+        self.followers_overlay = Overlay()
+        self.loaded = False
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        # Changes made while a reload is running, replayed onto the new graph
+        self.changes_during_load: list[tuple[bool, int, int]] | None = None
+
+    def load(self):
+        with self.load_lock:
+            self.load_graph()
+
+    def load_graph(self):
+        start = time.perf_counter()
+
+        with self.lock:
+            self.changes_during_load = []
+
+        with engine.connect() as connection:
+            result = connection.execution_options(yield_per=FOLLOW_FETCH_SIZE).execute(
+                text("SELECT follower_id, following_id, extract(epoch FROM followed_at) FROM follow")
+            )
+            edges = np.fromiter(chain.from_iterable(result), dtype=np.float64).reshape(-1, 3)
+
+        followers = edges[:, 0].astype(np.int64)
+        followings = edges[:, 1].astype(np.int64)
+        followed_at = edges[:, 2]
+
+        following_base = CSRAdjacency(followers, followings, followed_at)
+        followers_base = CSRAdjacency(followings, followers, followed_at)
+
+        # Swap everything at once so readers never mix two loads
+        with self.lock:
+            self.following_base = following_base
+            self.followers_base = followers_base
+            self.following_overlay = Overlay()
+            self.followers_overlay = Overlay()
+
+            for is_follow, follower_id, following_id in self.changes_during_load:
+                self.apply_change(is_follow, follower_id, following_id)
+            self.changes_during_load = None
+            self.loaded = True
+
+        print(f"Loaded follow graph with {len(edges)} follows in {time.perf_counter() - start:.2f}s")
+
+    def ensure_loaded(self):
+        if self.loaded:
+            return
+
+        with self.load_lock:
+            if not self.loaded:
+                self.load_graph()
+
+    def apply_change(self, is_follow: bool, follower_id: int, following_id: int):
+        # Caller holds self.lock
+        if is_follow:
+            self.following_overlay.add(follower_id, following_id)
+            self.followers_overlay.add(following_id, follower_id)
+        else:
+            self.following_overlay.remove(follower_id, following_id)
+            self.followers_overlay.remove(following_id, follower_id)
+
+        if self.changes_during_load is not None:
+            self.changes_during_load.append((is_follow, follower_id, following_id))
+
+    def follow(self, follower_id: int, following_id: int):
+        with self.lock:
+            self.apply_change(True, follower_id, following_id)
+
+    def unfollow(self, follower_id: int, following_id: int):
+        with self.lock:
+            self.apply_change(False, follower_id, following_id)
+
+    def following(self, user_id: int) -> np.ndarray:
+        """Ids user_id follows, most recent first."""
+        self.ensure_loaded()
+        with self.lock:
+            return self.following_overlay.apply(user_id, self.following_base.row(user_id))
+
+    def followers(self, user_id: int) -> np.ndarray:
+        """Ids following user_id, most recent first."""
+        self.ensure_loaded()
+        with self.lock:
+            return self.followers_overlay.apply(user_id, self.followers_base.row(user_id))
+
+    def sync_row(self, is_following_side: bool, user_id: int, current: np.ndarray, actual: list[int]):
+        actual_set = set(actual)
+        current_set = set(current.tolist())
+
+        with self.lock:
+            # Oldest first, so the overlay keeps the most recent follow in front
+            for other_id in reversed(actual):
+                if other_id not in current_set:
+                    pair = (user_id, other_id) if is_following_side else (other_id, user_id)
+                    self.apply_change(True, *pair)
+            for other_id in current_set - actual_set:
+                pair = (user_id, other_id) if is_following_side else (other_id, user_id)
+                self.apply_change(False, *pair)
+
+    def ensure_fresh(self, session: Session, user_id: int, following_count: int, follower_count: int):
+        """
+        Reload a user's own rows when they disagree with the user's counter
+        columns, which catches follows made through another worker since the
+        last load. Both lookups are primary key or index range scans.
+        """
+        following = self.following(user_id)
+        if len(following) != following_count:
+            self.sync_row(True, user_id, following, session.exec(
+                select(Follow.following_id)
+                .where(Follow.follower_id == user_id)
+                .order_by(Follow.followed_at.desc())
+            ).all())
+
+        followers = self.followers(user_id)
+        if len(followers) != follower_count:
+            self.sync_row(False, user_id, followers, session.exec(
+                select(Follow.follower_id)
+                .where(Follow.following_id == user_id)
+                .order_by(Follow.followed_at.desc())
+            ).all())
+
+    def relationships(self, user_id: int, other_ids: list[int]) -> list[tuple[int, bool, bool]]:
+        """(other_id, user follows other, other follows user) for each of other_ids."""
+        ids = np.array(other_ids, dtype=np.int64)
+        following = np.isin(ids, self.following(user_id))
+        followed_by = np.isin(ids, self.followers(user_id))
+
+        return list(zip(other_ids, following.tolist(), followed_by.tolist()))
+
+    def suggestions(self, user_id: int, limit: int) -> list[tuple[int, int]]:
+        """
+        (candidate_id, mutual_count) for users followed by the people user_id
+        follows, ranked by how many of them follow the candidate.
+        """
+        followees = self.following(user_id)[:FOLLOW_SUGGESTION_MAX_FANOUT]
+        if len(followees) == 0:
+            return []
+
+        reachable = np.concatenate([self.following(int(followee)) for followee in followees])
+        candidates, mutual_counts = np.unique(reachable, return_counts=True)
+
+        keep = ~np.isin(candidates, followees) & (candidates != user_id)
+        candidates, mutual_counts = candidates[keep], mutual_counts[keep]
+
+        # Most mutual follows first, then the lowest id for a stable order
+        top = np.lexsort((candidates, -mutual_counts))[:limit]
+
+        return list(zip(candidates[top].tolist(), mutual_counts[top].tolist()))
+
+follow_graph = FollowGraph()
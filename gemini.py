@@ -0,0 +1,27 @@
+from google import genai
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+GEMINI_MODEL = "gemini-2.0-flash"
+
+# Process-wide client, created once at startup by init_gemini_client()
+gemini_client: genai.Client | None = None
+
+def init_gemini_client():
+    global gemini_client
+
+    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+    if not GEMINI_API_KEY:
+        raise RuntimeError("GEMINI_API_KEY is not set in environment variables")
+
+    gemini_client = genai.Client(api_key=GEMINI_API_KEY)
+
+    return gemini_client
+
+def get_gemini_client():
+    if gemini_client is None:
+        return init_gemini_client()
+
+    return gemini_client
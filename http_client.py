@@ -0,0 +1,158 @@
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+from typing import Iterator
+import asyncio
+import httpx
+import os
+
+load_dotenv()
+
+OUTBOUND_MAX_CONNECTIONS = int(os.getenv("OUTBOUND_MAX_CONNECTIONS", "100"))
+OUTBOUND_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OUTBOUND_MAX_KEEPALIVE_CONNECTIONS", "20"))
+OUTBOUND_MAX_CONNECTIONS_PER_HOST = int(os.getenv("OUTBOUND_MAX_CONNECTIONS_PER_HOST", "6"))
+OUTBOUND_CONNECT_TIMEOUT_SECONDS = float(os.getenv("OUTBOUND_CONNECT_TIMEOUT_SECONDS", "5"))
+OUTBOUND_READ_TIMEOUT_SECONDS = float(os.getenv("OUTBOUND_READ_TIMEOUT_SECONDS", "15"))
+# Scraped pages are truncated after this many bytes
+SCRAPE_MAX_BODY_BYTES = int(os.getenv("SCRAPE_MAX_BODY_BYTES", str(2 * 1024 * 1024)))
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+OUTBOUND_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+class NonHtmlContentError(Exception):
+    pass
+
+def build_client_options() -> dict:
+    return {
+        "headers": OUTBOUND_HEADERS,
+        "http2": True,
+        "follow_redirects": True,
+        "limits": httpx.Limits(
+            max_connections=OUTBOUND_MAX_CONNECTIONS,
+            max_keepalive_connections=OUTBOUND_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        "timeout": httpx.Timeout(
+            OUTBOUND_READ_TIMEOUT_SECONDS,
+            connect=OUTBOUND_CONNECT_TIMEOUT_SECONDS,
+        ),
+    }
+
+# App-lifetime clients. The async client serves request handlers and the sync
+# client serves startup/CLI downloads; both share the same pool settings.
+http_client: httpx.AsyncClient | None = None
+sync_http_client: httpx.Client | None = None
+
+# httpx only limits connections globally, so per-host limits are enforced here
+host_semaphores: dict[str, asyncio.Semaphore] = {}
+
+def init_http_client():
+    global http_client
+    http_client = httpx.AsyncClient(**build_client_options())
+
+    return http_client
+
+async def close_http_client():
+    global http_client, sync_http_client
+
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+
+    if sync_http_client is not None:
+        sync_http_client.close()
+        sync_http_client = None
+
+def get_http_client() -> httpx.AsyncClient:
+    if http_client is None:
+        return init_http_client()
+
+    return http_client
+
+def get_sync_http_client() -> httpx.Client:
+    global sync_http_client
+
+    if sync_http_client is None:
+        sync_http_client = httpx.Client(**build_client_options())
+
+    return sync_http_client
+
+def get_host_semaphore(url: str) -> asyncio.Semaphore:
+    host = urlsplit(url).hostname or ""
+    if host not in host_semaphores:
+        host_semaphores[host] = asyncio.Semaphore(OUTBOUND_MAX_CONNECTIONS_PER_HOST)
+
+    return host_semaphores[host]
+
+async def fetch_html(url: str, max_bytes: int = SCRAPE_MAX_BODY_BYTES) -> str:
+    """
+    Stream an HTML page through the shared client, keeping at most max_bytes.
+
+    Raises NonHtmlContentError before reading the body if the server reports a
+    non-HTML content type, and httpx.HTTPError for network or status errors.
+    """
+    client = get_http_client()
+
+    async with get_host_semaphore(url):
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+
+            content_type = response.headers.get("content-type", "").lower()
+            if content_type and not content_type.startswith(HTML_CONTENT_TYPES):
+                raise NonHtmlContentError(content_type)
+
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body.extend(chunk[:max_bytes - len(body)])
+                if len(body) >= max_bytes:
+                    break
+
+            return body.decode(response.encoding or "utf-8", errors="replace")
+
+@contextmanager
+def open_text_source(path: str) -> Iterator[Iterator[str]]:
+    """Yield the lines of a local file or a URL streamed through the shared sync client."""
+    if path.startswith("http"):
+        with get_sync_http_client().stream("GET", path) as response:
+            response.raise_for_status()
+            yield response.iter_lines()
+    else:
+        with open(path, newline="", encoding="utf-8") as file:
+            yield file
+
+def download_if_modified(
+    url: str, path: str, etag: str | None = None, last_modified: str | None = None
+) -> dict | None:
+    """
+    Conditionally download url to path through the shared sync client.
+
+    Returns None if the server answers 304 Not Modified, otherwise the new
+    validators as {"etag": ..., "last_modified": ...}. The file is written to a
+    temporary path first so a failed download never replaces the cached copy.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    with get_sync_http_client().stream("GET", url, headers=headers) as response:
+        if response.status_code == 304:
+            return None
+
+        response.raise_for_status()
+
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as file:
+            for chunk in response.iter_bytes():
+                file.write(chunk)
+        os.replace(temporary_path, path)
+
+        return {
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+        }
@@ -0,0 +1,250 @@
+from dotenv import load_dotenv
+from abc import ABC, abstractmethod
+import hashlib
+import asyncio
+import json
+import time
+import os
+import re
+
+load_dotenv()
+
+# "gemini" in production, "stub" for offline development and load tests
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+
+# Seconds a single call may take before it is abandoned
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+# Maximum number of LLM requests in flight for this worker process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+# Retries on provider errors before giving up
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BACKOFF_SECONDS = float(os.getenv("LLM_RETRY_BACKOFF_SECONDS", "1"))
+
+# Token bucket: sustained requests per second, burst size and how long a caller may queue
+LLM_RATE_LIMIT_PER_SECOND = float(os.getenv("LLM_RATE_LIMIT_PER_SECOND", "2"))
+LLM_RATE_LIMIT_BURST = int(os.getenv("LLM_RATE_LIMIT_BURST", "5"))
+LLM_RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT_SECONDS", "5"))
+
+# Consecutive failures that open the circuit, and how long it stays open
+LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+LLM_CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+
+STUB_LLM_LATENCY_SECONDS = float(os.getenv("STUB_LLM_LATENCY_SECONDS", "0.5"))
+
+class LLMUnavailableError(Exception):
+    """The provider is rate limited or the circuit is open; nothing was sent."""
+    pass
+
+class LLMServerError(Exception):
+    """The provider failed to answer (overloaded, unavailable, internal error)."""
+    pass
+
+class LLMBackend(ABC):
+    @abstractmethod
+    async def generate(self, prompt: str) -> str:
+        ...
+
+class GeminiBackend(LLMBackend):
+    def __init__(self):
+        from .gemini import init_gemini_client, GEMINI_MODEL
+
+        self.client = init_gemini_client()
+        self.model = GEMINI_MODEL
+
+    async def generate(self, prompt: str) -> str:
+        from google.genai.errors import ServerError
+
+        try:
+            result = await self.client.aio.models.generate_content(
+                model=self.model,
+                contents=[prompt]
+            )
+        except ServerError as e:
+            raise LLMServerError(str(e)) from e
+
+        return result.text
+
+class StubBackend(LLMBackend):
+    """
+    Deterministic offline stand-in for Gemini. Extraction prompts are answered
+    from the page's <title> and og:image, part type prompts with the "Other"
+    type, after sleeping for latency_seconds.
+    """
+
+    def __init__(self, latency_seconds: float = STUB_LLM_LATENCY_SECONDS):
+        self.latency_seconds = latency_seconds
+
+    async def generate(self, prompt: str) -> str:
+        await asyncio.sleep(self.latency_seconds)
+
+        if "HTML:" in prompt:
+            return self.extract_part(prompt)
+
+        return self.pick_part_type(prompt)
+
+    def extract_part(self, prompt: str) -> str:
+        html = prompt.split("HTML:", 1)[1]
+
+        title_match = re.search(r"<title[^>]*>(.*?)</title>", html, re.IGNORECASE | re.DOTALL)
+        title = re.sub(r"\s+", " ", title_match.group(1)).strip() if title_match else "Unknown Part"
+
+        image_match = re.search(r'property="og:image"\s+content="([^"]+)"', html)
+        digest = hashlib.sha1(html.encode("utf-8", errors="replace")).hexdigest()
+
+        return json.dumps({
+            "brand": title.split(" ")[0],
+            "part_name": title,
+            "part_number": digest[:8].upper(),
+            "image_url": image_match.group(1) if image_match else None,
+            "description": f"Stub description for {title}",
+        })
+
+    def pick_part_type(self, prompt: str) -> str:
+        other_match = re.search(r"id=(\d+),? type='Other'", prompt)
+        if other_match:
+            return other_match.group(1)
+
+        first_id = re.search(r"id=(\d+)", prompt)
+        return first_id.group(1) if first_id else "1"
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, max_wait: float):
+        deadline = time.monotonic() + max_wait
+
+        async with self.lock:
+            while True:
+                self.refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+                if time.monotonic() + wait > deadline:
+                    raise LLMUnavailableError("LLM rate limit exceeded")
+
+                await asyncio.sleep(wait)
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls until
+    reset_seconds have passed. A single trial call is then let through; its
+    outcome closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+    def before_call(self):
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                raise LLMUnavailableError("LLM circuit is open")
+            self.state = "half_open"
+
+        if self.state == "half_open":
+            if self.trial_in_flight:
+                raise LLMUnavailableError("LLM circuit is half open")
+            self.trial_in_flight = True
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                print(f"LLM circuit opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+class LLMProvider:
+    def __init__(self, backend: LLMBackend):
+        self.backend = backend
+        self.semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        self.rate_limiter = TokenBucket(LLM_RATE_LIMIT_PER_SECOND, LLM_RATE_LIMIT_BURST)
+        self.circuit_breaker = CircuitBreaker(LLM_CIRCUIT_FAILURE_THRESHOLD, LLM_CIRCUIT_RESET_SECONDS)
+
+    async def generate(self, prompt: str) -> str:
+        """
+        Send a prompt to the backend and return the response text.
+
+        Raises LLMUnavailableError without calling the backend while the circuit
+        is open or the rate limit cannot be met in time, LLMServerError once
+        retries are exhausted and asyncio.TimeoutError if the last attempt
+        timed out.
+        """
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            self.circuit_breaker.before_call()
+
+            try:
+                await self.rate_limiter.acquire(LLM_RATE_LIMIT_MAX_WAIT_SECONDS)
+
+                async with self.semaphore:
+                    text = await asyncio.wait_for(
+                        self.backend.generate(prompt),
+                        timeout=LLM_TIMEOUT_SECONDS
+                    )
+            except LLMUnavailableError:
+                # Nothing reached the provider, so release a half-open trial slot
+                self.circuit_breaker.trial_in_flight = False
+                raise
+            except (LLMServerError, asyncio.TimeoutError) as e:
+                self.circuit_breaker.record_failure()
+                if attempt == LLM_MAX_RETRIES:
+                    raise
+
+                delay = LLM_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+                print(f"LLM error, retrying in {delay}s ({attempt + 1}/{LLM_MAX_RETRIES}): {e!r}")
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Includes cancellation, which would otherwise leave a half-open
+                # circuit waiting forever on a trial that never reports back
+                self.circuit_breaker.trial_in_flight = False
+                raise
+
+            self.circuit_breaker.record_success()
+            return text
+
+def create_backend(name: str) -> LLMBackend:
+    if name == "gemini":
+        return GeminiBackend()
+    if name == "stub":
+        return StubBackend()
+
+    raise RuntimeError(f"Unknown LLM_BACKEND '{name}'. Expected 'gemini' or 'stub'")
+
+# Process-wide provider, created once at startup by init_llm_provider()
+llm_provider: LLMProvider | None = None
+
+def init_llm_provider(backend: LLMBackend | None = None) -> LLMProvider:
+    global llm_provider
+    llm_provider = LLMProvider(backend or create_backend(LLM_BACKEND))
+
+    return llm_provider
+
+def get_llm_provider() -> LLMProvider:
+    if llm_provider is None:
+        return init_llm_provider()
+
+    return llm_provider
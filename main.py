@@ -1,9 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .database import (
-    create_db_and_tables, convert_csv_to_db, populate_part_types,
-    insert_brands_to_db, import_unique_vehicles_from_csv, install_fuzzy_search_extension
-)
+from .database import check_database_ready
+from .migrations import check_migrations_applied
+from .http_client import init_http_client, close_http_client
+from .purge import purge_tombstoned, PURGE_INTERVAL_SECONDS
+from .tasks import start_periodic_task, start_background_task, stop_periodic_tasks
+from .part_classifier import part_type_classifier
+from .usernames import username_index, USERNAME_INDEX_REFRESH_SECONDS
+from .related_parts import refresh_related_parts, RELATED_PARTS_REFRESH_SECONDS
+from .similar_builds import similar_builds_index, SIMILAR_BUILDS_REFRESH_SECONDS
+from .follow_graph import follow_graph, FOLLOW_GRAPH_REFRESH_SECONDS
 from .routers import (
     auth, comments, likes, validation, users, posts, admin, vehicles, builds, parts, scrape, follow
 )
@@ -45,23 +51,10 @@ app.include_router(likes.router)
 
 @app.on_event("startup")
 def on_startup():
-    VEHICLES_CSV_PATH = os.getenv("VEHICLES_CSV_PATH")
-    if not VEHICLES_CSV_PATH:
-        raise RuntimeError("VEHICLES_CSV_PATH is not set in the environment variables.")
-
-    BRANDS_TXT_PATH = os.getenv("BRANDS_TXT_PATH")
-    if not BRANDS_TXT_PATH:
-        raise RuntimeError("BRANDS_TXT_PATH is not set in the environment variables")
-
-    UNIQUE_VEHICLES_CSV_PATH = os.getenv("UNIQUE_VEHICLES_CSV_PATH")
-    if not UNIQUE_VEHICLES_CSV_PATH:
-        raise RuntimeError("UNIQUE_VEHICLES_CSV_PATH is not set in the environment variables.")
-
-    create_db_and_tables()
-    insert_brands_to_db(BRANDS_TXT_PATH)
-    populate_part_types()
-    import_unique_vehicles_from_csv(UNIQUE_VEHICLES_CSV_PATH)
-    install_fuzzy_search_extension()
+    # Schema, seed data and extensions are handled by `manage bootstrap`;
+    # workers only verify that the database is ready to serve requests
+    check_database_ready()
+    check_migrations_applied()
 
     # Initialize Firebase
     firebase_key_path = os.getenv("FIREBASE_KEY_PATH")
@@ -71,6 +64,38 @@ def on_startup():
     cred = credentials.Certificate(firebase_key_path)
     firebase_admin.initialize_app(cred)
 
+    # Pooled outbound HTTP client used by /scrape
+    init_http_client()
+
+@app.on_event("startup")
+async def start_background_tasks():
+    # Trains the local part type classifier off the event loop; scrapes use
+    # the Gemini fallback until it is ready
+    start_background_task("part_classifier", part_type_classifier.fit)
+    # Deletes the content of tombstoned users and posts in small batches
+    start_periodic_task("purge", PURGE_INTERVAL_SECONDS, purge_tombstoned)
+    # Answers username availability checks from memory
+    start_periodic_task(
+        "username_index", USERNAME_INDEX_REFRESH_SECONDS, username_index.load, run_immediately=True
+    )
+    # Rescores parts on changed builds and serves related parts from memory
+    start_periodic_task(
+        "related_parts", RELATED_PARTS_REFRESH_SECONDS, refresh_related_parts, run_immediately=True
+    )
+    # MinHash index of build part sets for similar build lookups
+    start_periodic_task(
+        "similar_builds", SIMILAR_BUILDS_REFRESH_SECONDS, similar_builds_index.sync, run_immediately=True
+    )
+    # Follow graph for relationship checks, following lists and suggestions
+    start_periodic_task(
+        "follow_graph", FOLLOW_GRAPH_REFRESH_SECONDS, follow_graph.load, run_immediately=True
+    )
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await stop_periodic_tasks()
+    await close_http_client()
+
 @app.get("/")
 async def root():
     return {"message": "Hello World"}
@@ -0,0 +1,120 @@
+from dotenv import load_dotenv
+import argparse
+import os
+
+load_dotenv()
+
+def get_required_env(name: str) -> str:
+    value = os.getenv(name)
+    if not value:
+        raise RuntimeError(f"{name} is not set in the environment variables.")
+
+    return value
+
+def sync(args):
+    from .database import sync_brands, sync_vehicles
+
+    if not args.vehicles_only:
+        sync_brands(get_required_env("BRANDS_TXT_PATH"), force=args.force)
+
+    if not args.brands_only:
+        sync_vehicles(get_required_env("UNIQUE_VEHICLES_CSV_PATH"), force=args.force)
+
+def migrate(args):
+    from .migrations import migrate as apply_migrations
+
+    required_backfills = apply_migrations()
+    if required_backfills:
+        print(f"Run `manage backfill` to populate: {', '.join(required_backfills)}")
+
+def backfill(args):
+    from .migrations import get_pending_backfills, run_backfill
+
+    names = args.names or get_pending_backfills()
+    if not names:
+        print("No pending backfills")
+
+    for name in names:
+        run_backfill(name, chunk_size=args.chunk_size, pause_seconds=args.pause)
+
+def rollups(args):
+    from .rollups import rebuild_rollups
+
+    rebuild_rollups()
+
+def related_parts(args):
+    from .related_parts import update_related_parts
+
+    update_related_parts(full=args.full)
+
+def bootstrap(args):
+    from .database import install_fuzzy_search_extension, populate_part_types
+    from .migrations import migrate as apply_migrations, run_backfill
+
+    for name in apply_migrations():
+        run_backfill(name)
+
+    install_fuzzy_search_extension()
+    populate_part_types()
+    # Always re-read the reference data so a bootstrap can never finish with
+    # empty brand or vehicle tables because a source looked unchanged
+    args.force = True
+    sync(args)
+
+def main():
+    parser = argparse.ArgumentParser(description="Ignition Link management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sync_parser = subparsers.add_parser(
+        "sync", help="Insert brands and vehicles that are new in the upstream datasets"
+    )
+    sync_parser.add_argument(
+        "--force", action="store_true", help="Ignore the cached copies and re-read every source"
+    )
+    only_group = sync_parser.add_mutually_exclusive_group()
+    only_group.add_argument("--brands-only", action="store_true")
+    only_group.add_argument("--vehicles-only", action="store_true")
+    sync_parser.set_defaults(handler=sync)
+
+    migrate_parser = subparsers.add_parser(
+        "migrate", help="Apply pending schema migrations"
+    )
+    migrate_parser.set_defaults(handler=migrate)
+
+    backfill_parser = subparsers.add_parser(
+        "backfill", help="Run or resume data backfills left by migrations"
+    )
+    backfill_parser.add_argument(
+        "names", nargs="*", help="Backfills to run, defaults to every unfinished one"
+    )
+    backfill_parser.add_argument(
+        "--chunk-size", type=int, default=1000, help="Rows updated per transaction"
+    )
+    backfill_parser.add_argument(
+        "--pause", type=float, default=0.0, help="Seconds to sleep between chunks"
+    )
+    backfill_parser.set_defaults(handler=backfill)
+
+    rollups_parser = subparsers.add_parser(
+        "rollups", help="Recompute the vehicle and part popularity rollups"
+    )
+    rollups_parser.set_defaults(handler=rollups)
+
+    related_parts_parser = subparsers.add_parser(
+        "related-parts", help="Rescore part recommendations for builds changed since the last run"
+    )
+    related_parts_parser.add_argument(
+        "--full", action="store_true", help="Rescore every part instead of only the changed ones"
+    )
+    related_parts_parser.set_defaults(handler=related_parts)
+
+    bootstrap_parser = subparsers.add_parser(
+        "bootstrap", help="Apply migrations, install extensions and seed reference data"
+    )
+    bootstrap_parser.set_defaults(handler=bootstrap, brands_only=False, vehicles_only=False)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,641 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlmodel import SQLModel
+from .database import (
+    engine, User, Post, Like, Comment, Vehicle, Follow, BuildPartLink, Build, PartType, Brand,
+    Part, DomainExtractor, VehiclePartCount, PartBuildCount, VehicleBuildCount,
+    RelatedPart, RelatedPartDirty, DatasetSync, BuildChange
+)
+from .rollups import rebuild_rollup_tables
+import time
+
+# Serializes migration runs across processes
+MIGRATION_LOCK_ID = 741_302
+
+class ConcurrentIndex:
+    """
+    An index built with CREATE INDEX CONCURRENTLY so the table stays writable.
+    Runs outside of a transaction; an invalid index left behind by an earlier
+    failed build is dropped and rebuilt.
+    """
+
+    def __init__(self, name: str, table: str, columns: str, unique: bool = False, where: str | None = None):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.unique = unique
+        self.where = where
+
+    def apply(self):
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            self.build(connection)
+
+    def build(self, connection: Connection):
+        is_valid = connection.execute(
+            text(
+                "SELECT i.indisvalid FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+            ),
+            {"name": self.name}
+        ).scalar()
+
+        if is_valid is False:
+            connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{self.name}"'))
+
+        unique = "UNIQUE " if self.unique else ""
+        where = f" WHERE {self.where}" if self.where else ""
+        connection.execute(text(
+            f'CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS "{self.name}" '
+            f'ON "{self.table}" ({self.columns}){where}'
+        ))
+
+class CascadeForeignKey:
+    """
+    Recreates the foreign key on table.column with ON DELETE CASCADE. The new
+    constraint is added NOT VALID under a short lock and validated in a second
+    transaction, which scans the table without blocking writes.
+    """
+
+    # ON DELETE action and its pg_constraint.confdeltype code
+    on_delete = "CASCADE"
+    delete_type = "c"
+
+    def __init__(self, table: str, column: str, referenced_table: str):
+        self.table = table
+        self.column = column
+        self.referenced_table = referenced_table
+
+    def apply(self):
+        with engine.begin() as connection:
+            connection.execute(text("SET LOCAL lock_timeout = '5s'"))
+
+            existing = connection.execute(
+                text(
+                    "SELECT con.conname, con.confdeltype FROM pg_constraint con "
+                    "JOIN pg_attribute att ON att.attrelid = con.conrelid AND att.attnum = ANY(con.conkey) "
+                    "WHERE con.contype = 'f' AND con.conrelid = CAST(:table AS regclass) "
+                    "AND att.attname = :column"
+                ),
+                {"table": f'"{self.table}"', "column": self.column}
+            ).first()
+
+            name = existing.conname if existing else f"{self.table}_{self.column}_fkey"
+
+            # A matching confdeltype means the constraint already has the action
+            if existing is None or existing.confdeltype != self.delete_type:
+                if existing is not None:
+                    connection.execute(text(f'ALTER TABLE "{self.table}" DROP CONSTRAINT "{name}"'))
+
+                connection.execute(text(
+                    f'ALTER TABLE "{self.table}" ADD CONSTRAINT "{name}" '
+                    f'FOREIGN KEY ({self.column}) REFERENCES "{self.referenced_table}" (id) '
+                    f'ON DELETE {self.on_delete} NOT VALID'
+                ))
+
+        with engine.begin() as connection:
+            connection.execute(text(f'ALTER TABLE "{self.table}" VALIDATE CONSTRAINT "{name}"'))
+
+class SetNullForeignKey(CascadeForeignKey):
+    """Recreates the foreign key on table.column with ON DELETE SET NULL, the same way."""
+
+    on_delete = "SET NULL"
+    delete_type = "n"
+
+class Migration:
+    """
+    A numbered schema change. Steps are SQL strings or callables taking a
+    connection, run in order; consecutive ones share a transaction, while
+    ConcurrentIndex and CascadeForeignKey steps manage their own. Steps must be idempotent
+    because a migration interrupted part way is re-run from the start.
+    """
+
+    def __init__(self, version: int, name: str, steps: list, backfills: tuple[str, ...] = ()):
+        self.version = version
+        self.name = name
+        self.steps = steps
+        self.backfills = backfills
+
+class BackfillJob:
+    """
+    A resumable data backfill over a table's id range. update_sql is run for
+    each chunk with :start and :end bound (start exclusive, end inclusive) and
+    progress is committed with every chunk.
+    """
+
+    def __init__(self, name: str, table: str, update_sql: str):
+        self.name = name
+        self.table = table
+        self.update_sql = update_sql
+
+# Tables that predate the migrations. Later migrations create their own tables;
+# the columns they add are already present here on a fresh database and are
+# skipped by their IF NOT EXISTS checks
+INITIAL_TABLES = [
+    User, Post, Like, Comment, Vehicle, Follow, BuildPartLink, Build, PartType, Brand, Part,
+    DomainExtractor,
+]
+
+def create_initial_tables(connection: Connection):
+    SQLModel.metadata.create_all(connection, tables=[model.__table__ for model in INITIAL_TABLES])
+
+def create_counter_trigger(table: str, function: str, statements: dict[str, str]) -> str:
+    return f"""
+        CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {statements["INSERT"]}
+            ELSE
+                {statements["DELETE"]}
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS {function}_trigger ON "{table}";
+        CREATE TRIGGER {function}_trigger AFTER INSERT OR DELETE ON "{table}"
+            FOR EACH ROW EXECUTE FUNCTION {function}();
+    """
+
+def create_rollup_tables(connection: Connection):
+    SQLModel.metadata.create_all(
+        connection,
+        tables=[VehiclePartCount.__table__, PartBuildCount.__table__, VehicleBuildCount.__table__]
+    )
+
+# Build rows are counted per vehicle. Deletes run BEFORE the row goes so the
+# build's part links can still be subtracted from its vehicle's part counts;
+# links removed by the cascade afterwards no longer find their build
+BUILD_ROLLUP_TRIGGER = """
+    CREATE OR REPLACE FUNCTION maintain_build_rollups() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE vehiclebuildcount SET build_count = build_count - 1
+            WHERE vehicle_id = OLD.vehicle_id;
+
+            UPDATE vehiclepartcount c SET build_count = c.build_count - 1
+            FROM buildpartlink l
+            WHERE l.build_id = OLD.id AND c.vehicle_id = OLD.vehicle_id AND c.part_id = l.part_id;
+        END IF;
+
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO vehiclebuildcount (vehicle_id, build_count) VALUES (NEW.vehicle_id, 1)
+            ON CONFLICT (vehicle_id) DO UPDATE SET build_count = vehiclebuildcount.build_count + 1;
+
+            INSERT INTO vehiclepartcount (vehicle_id, part_id, build_count)
+            SELECT NEW.vehicle_id, l.part_id, 1 FROM buildpartlink l WHERE l.build_id = NEW.id
+            ON CONFLICT (vehicle_id, part_id) DO UPDATE SET build_count = vehiclepartcount.build_count + 1;
+        END IF;
+
+        IF TG_OP = 'DELETE' THEN
+            RETURN OLD;
+        END IF;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS maintain_build_rollups_insert_trigger ON build;
+    CREATE TRIGGER maintain_build_rollups_insert_trigger AFTER INSERT ON build
+        FOR EACH ROW EXECUTE FUNCTION maintain_build_rollups();
+
+    DROP TRIGGER IF EXISTS maintain_build_rollups_update_trigger ON build;
+    CREATE TRIGGER maintain_build_rollups_update_trigger AFTER UPDATE OF vehicle_id ON build
+        FOR EACH ROW WHEN (OLD.vehicle_id IS DISTINCT FROM NEW.vehicle_id)
+        EXECUTE FUNCTION maintain_build_rollups();
+
+    DROP TRIGGER IF EXISTS maintain_build_rollups_delete_trigger ON build;
+    CREATE TRIGGER maintain_build_rollups_delete_trigger BEFORE DELETE ON build
+        FOR EACH ROW EXECUTE FUNCTION maintain_build_rollups();
+"""
+
+# Part links are counted per statement from the transition table, so bulk
+# linking and purge batches upsert each rollup row once
+PART_LINK_ROLLUP_TRIGGERS = """
+    CREATE OR REPLACE FUNCTION maintain_part_link_rollups_insert() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO partbuildcount (part_id, build_count)
+        SELECT part_id, count(*) FROM inserted_links GROUP BY part_id ORDER BY part_id
+        ON CONFLICT (part_id) DO UPDATE SET build_count = partbuildcount.build_count + EXCLUDED.build_count;
+
+        INSERT INTO vehiclepartcount (vehicle_id, part_id, build_count)
+        SELECT b.vehicle_id, l.part_id, count(*)
+        FROM inserted_links l JOIN build b ON b.id = l.build_id
+        GROUP BY b.vehicle_id, l.part_id ORDER BY b.vehicle_id, l.part_id
+        ON CONFLICT (vehicle_id, part_id) DO UPDATE SET build_count = vehiclepartcount.build_count + EXCLUDED.build_count;
+
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION maintain_part_link_rollups_delete() RETURNS trigger AS $$
+    BEGIN
+        UPDATE partbuildcount c SET build_count = c.build_count - d.links
+        FROM (SELECT part_id, count(*) AS links FROM deleted_links GROUP BY part_id) d
+        WHERE c.part_id = d.part_id;
+
+        UPDATE vehiclepartcount c SET build_count = c.build_count - d.links
+        FROM (
+            SELECT b.vehicle_id, l.part_id, count(*) AS links
+            FROM deleted_links l JOIN build b ON b.id = l.build_id
+            GROUP BY b.vehicle_id, l.part_id
+        ) d
+        WHERE c.vehicle_id = d.vehicle_id AND c.part_id = d.part_id;
+
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS maintain_part_link_rollups_insert_trigger ON buildpartlink;
+    CREATE TRIGGER maintain_part_link_rollups_insert_trigger AFTER INSERT ON buildpartlink
+        REFERENCING NEW TABLE AS inserted_links
+        FOR EACH STATEMENT EXECUTE FUNCTION maintain_part_link_rollups_insert();
+
+    DROP TRIGGER IF EXISTS maintain_part_link_rollups_delete_trigger ON buildpartlink;
+    CREATE TRIGGER maintain_part_link_rollups_delete_trigger AFTER DELETE ON buildpartlink
+        REFERENCING OLD TABLE AS deleted_links
+        FOR EACH STATEMENT EXECUTE FUNCTION maintain_part_link_rollups_delete();
+"""
+
+def create_dataset_sync_table(connection: Connection):
+    SQLModel.metadata.create_all(connection, tables=[DatasetSync.__table__])
+
+def create_build_change_table(connection: Connection):
+    SQLModel.metadata.create_all(connection, tables=[BuildChange.__table__])
+
+# clock_timestamp rather than now() so a change is stamped close to its commit
+# even in a long transaction
+BUILD_CHANGE_TRIGGER = """
+    CREATE OR REPLACE FUNCTION record_build_change() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO buildchange (build_id, changed_at)
+        VALUES (
+            CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END,
+            clock_timestamp() AT TIME ZONE 'UTC'
+        )
+        ON CONFLICT (build_id) DO UPDATE SET changed_at = EXCLUDED.changed_at;
+
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS record_build_change_trigger ON build;
+    CREATE TRIGGER record_build_change_trigger AFTER INSERT OR DELETE OR UPDATE OF version, vehicle_id ON build
+        FOR EACH ROW EXECUTE FUNCTION record_build_change();
+"""
+
+def create_related_part_tables(connection: Connection):
+    SQLModel.metadata.create_all(
+        connection, tables=[RelatedPart.__table__, RelatedPartDirty.__table__]
+    )
+
+# Queues every part whose co-occurrences a link change affects: all parts of
+# the changed builds, plus the removed parts, which are no longer in them
+RELATED_PART_DIRTY_TRIGGERS = """
+    CREATE OR REPLACE FUNCTION mark_related_parts_dirty_insert() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO relatedpartdirty (part_id)
+        SELECT DISTINCT l.part_id FROM buildpartlink l
+        WHERE l.build_id IN (SELECT build_id FROM inserted_links)
+        ORDER BY l.part_id
+        ON CONFLICT DO NOTHING;
+
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION mark_related_parts_dirty_delete() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO relatedpartdirty (part_id)
+        SELECT part_id FROM deleted_links
+        UNION
+        SELECT l.part_id FROM buildpartlink l
+        WHERE l.build_id IN (SELECT build_id FROM deleted_links)
+        ORDER BY part_id
+        ON CONFLICT DO NOTHING;
+
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS mark_related_parts_dirty_insert_trigger ON buildpartlink;
+    CREATE TRIGGER mark_related_parts_dirty_insert_trigger AFTER INSERT ON buildpartlink
+        REFERENCING NEW TABLE AS inserted_links
+        FOR EACH STATEMENT EXECUTE FUNCTION mark_related_parts_dirty_insert();
+
+    DROP TRIGGER IF EXISTS mark_related_parts_dirty_delete_trigger ON buildpartlink;
+    CREATE TRIGGER mark_related_parts_dirty_delete_trigger AFTER DELETE ON buildpartlink
+        REFERENCING OLD TABLE AS deleted_links
+        FOR EACH STATEMENT EXECUTE FUNCTION mark_related_parts_dirty_delete();
+"""
+
+MIGRATIONS = [
+    Migration(1, "initial_schema", [create_initial_tables]),
+    Migration(
+        2,
+        "part_catalogue_columns",
+        [
+            "ALTER TABLE part ADD COLUMN IF NOT EXISTS source_url VARCHAR",
+            "ALTER TABLE part ADD COLUMN IF NOT EXISTS part_number_normalized VARCHAR",
+            ConcurrentIndex("ix_part_source_url", "part", "source_url"),
+            ConcurrentIndex(
+                "ix_part_brand_id_part_number_normalized", "part", "brand_id, part_number_normalized"
+            ),
+        ],
+        backfills=("part_number_normalized",),
+    ),
+    Migration(
+        3,
+        "post_and_user_counters",
+        [
+            "ALTER TABLE post ADD COLUMN IF NOT EXISTS like_count INTEGER NOT NULL DEFAULT 0",
+            "ALTER TABLE post ADD COLUMN IF NOT EXISTS comment_count INTEGER NOT NULL DEFAULT 0",
+            'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS follower_count INTEGER NOT NULL DEFAULT 0',
+            'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS following_count INTEGER NOT NULL DEFAULT 0',
+            'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS post_count INTEGER NOT NULL DEFAULT 0',
+            # Triggers keep the counters correct for every write path, including cascades
+            create_counter_trigger("like", "maintain_post_like_count", {
+                "INSERT": "UPDATE post SET like_count = like_count + 1 WHERE id = NEW.post_id;",
+                "DELETE": "UPDATE post SET like_count = like_count - 1 WHERE id = OLD.post_id;",
+            }),
+            create_counter_trigger("comment", "maintain_post_comment_count", {
+                "INSERT": "UPDATE post SET comment_count = comment_count + 1 WHERE id = NEW.post_id;",
+                "DELETE": "UPDATE post SET comment_count = comment_count - 1 WHERE id = OLD.post_id;",
+            }),
+            create_counter_trigger("follow", "maintain_user_follow_counts", {
+                "INSERT": (
+                    'UPDATE "user" SET follower_count = follower_count + 1 WHERE id = NEW.following_id; '
+                    'UPDATE "user" SET following_count = following_count + 1 WHERE id = NEW.follower_id;'
+                ),
+                "DELETE": (
+                    'UPDATE "user" SET follower_count = follower_count - 1 WHERE id = OLD.following_id; '
+                    'UPDATE "user" SET following_count = following_count - 1 WHERE id = OLD.follower_id;'
+                ),
+            }),
+            create_counter_trigger("post", "maintain_user_post_count", {
+                "INSERT": 'UPDATE "user" SET post_count = post_count + 1 WHERE id = NEW.user_id;',
+                "DELETE": 'UPDATE "user" SET post_count = post_count - 1 WHERE id = OLD.user_id;',
+            }),
+        ],
+        backfills=("post_counters", "user_counters"),
+    ),
+    Migration(
+        4,
+        "cascading_deletes",
+        [
+            # Index the referencing side first so each cascade is an index lookup
+            ConcurrentIndex("ix_like_user_id", "like", "user_id"),
+            ConcurrentIndex("ix_comment_post_id", "comment", "post_id"),
+            ConcurrentIndex("ix_comment_user_id", "comment", "user_id"),
+            ConcurrentIndex("ix_follow_following_id", "follow", "following_id"),
+            ConcurrentIndex("ix_post_user_id", "post", "user_id"),
+            ConcurrentIndex("ix_build_user_id", "build", "user_id"),
+            ConcurrentIndex("ix_buildpartlink_part_id", "buildpartlink", "part_id"),
+            ConcurrentIndex("ix_part_submitted_by_id", "part", "submitted_by_id"),
+            CascadeForeignKey("like", "post_id", "post"),
+            CascadeForeignKey("like", "user_id", "user"),
+            CascadeForeignKey("comment", "post_id", "post"),
+            CascadeForeignKey("comment", "user_id", "user"),
+            CascadeForeignKey("follow", "follower_id", "user"),
+            CascadeForeignKey("follow", "following_id", "user"),
+            CascadeForeignKey("post", "user_id", "user"),
+            CascadeForeignKey("build", "user_id", "user"),
+            CascadeForeignKey("buildpartlink", "build_id", "build"),
+            CascadeForeignKey("buildpartlink", "part_id", "part"),
+            CascadeForeignKey("part", "submitted_by_id", "user"),
+        ],
+    ),
+    Migration(
+        5,
+        "tombstones",
+        [
+            'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP',
+            "ALTER TABLE post ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP",
+            ConcurrentIndex("ix_user_deleted_at", "user", "deleted_at", where="deleted_at IS NOT NULL"),
+            ConcurrentIndex("ix_post_deleted_at", "post", "deleted_at", where="deleted_at IS NOT NULL"),
+        ],
+    ),
+    Migration(
+        6,
+        "build_version",
+        ["ALTER TABLE build ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0"],
+    ),
+    Migration(
+        7,
+        "popularity_rollups",
+        [
+            create_rollup_tables,
+            BUILD_ROLLUP_TRIGGER,
+            PART_LINK_ROLLUP_TRIGGERS,
+            # Installing the triggers locks build and buildpartlink against
+            # writes until commit, so the initial counts cannot miss any
+            rebuild_rollup_tables,
+        ],
+    ),
+    Migration(
+        8,
+        "related_parts",
+        [
+            create_related_part_tables,
+            RELATED_PART_DIRTY_TRIGGERS,
+            # Queue every linked part so the first run scores the whole catalogue
+            "INSERT INTO relatedpartdirty (part_id) "
+            "SELECT DISTINCT part_id FROM buildpartlink ON CONFLICT DO NOTHING",
+        ],
+    ),
+    Migration(9, "dataset_sync_state", [create_dataset_sync_table]),
+    Migration(10, "build_change_feed", [create_build_change_table, BUILD_CHANGE_TRIGGER]),
+    Migration(
+        11,
+        "keep_parts_of_deleted_users",
+        [
+            # Catalogue parts stay linked to other users' builds when their
+            # submitter's account is deleted
+            "ALTER TABLE part ALTER COLUMN submitted_by_id DROP NOT NULL",
+            SetNullForeignKey("part", "submitted_by_id", "user"),
+        ],
+    ),
+]
+
+BACKFILLS = {
+    job.name: job for job in [
+        BackfillJob(
+            "part_number_normalized",
+            "part",
+            "UPDATE part SET part_number_normalized = "
+            "NULLIF(regexp_replace(lower(part_number), '[^a-z0-9]', '', 'g'), '') "
+            "WHERE id > :start AND id <= :end AND part_number IS NOT NULL"
+        ),
+        BackfillJob(
+            "post_counters",
+            "post",
+            'UPDATE post SET '
+            'like_count = (SELECT count(*) FROM "like" WHERE "like".post_id = post.id), '
+            'comment_count = (SELECT count(*) FROM comment WHERE comment.post_id = post.id) '
+            'WHERE id > :start AND id <= :end'
+        ),
+        BackfillJob(
+            "user_counters",
+            "user",
+            'UPDATE "user" SET '
+            'follower_count = (SELECT count(*) FROM follow WHERE follow.following_id = "user".id), '
+            'following_count = (SELECT count(*) FROM follow WHERE follow.follower_id = "user".id), '
+            'post_count = (SELECT count(*) FROM post WHERE post.user_id = "user".id) '
+            'WHERE id > :start AND id <= :end'
+        ),
+    ]
+}
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+def ensure_migration_tables(connection: Connection):
+    connection.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migration ("
+        "version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+        "applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+    ))
+    connection.execute(text(
+        "CREATE TABLE IF NOT EXISTS backfill_progress ("
+        "name VARCHAR PRIMARY KEY, last_id BIGINT NOT NULL DEFAULT 0, "
+        "target_id BIGINT, completed_at TIMESTAMPTZ)"
+    ))
+
+def get_applied_versions(connection: Connection) -> set[int]:
+    return set(connection.execute(text("SELECT version FROM schema_migration")).scalars())
+
+def run_steps(migration: Migration):
+    pending: list = []
+
+    def flush():
+        if not pending:
+            return
+
+        with engine.begin() as connection:
+            for step in pending:
+                if isinstance(step, str):
+                    connection.execute(text(step))
+                else:
+                    step(connection)
+        pending.clear()
+
+    for step in migration.steps:
+        if isinstance(step, (ConcurrentIndex, CascadeForeignKey)):
+            flush()
+            step.apply()
+        else:
+            pending.append(step)
+
+    flush()
+
+def migrate() -> list[str]:
+    """Apply every pending migration and return the backfills they require."""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_connection:
+        lock_connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+
+        try:
+            with engine.begin() as connection:
+                ensure_migration_tables(connection)
+                applied = get_applied_versions(connection)
+
+            required_backfills = []
+            for migration in MIGRATIONS:
+                if migration.version in applied:
+                    continue
+
+                print(f"Applying migration {migration.version:04d}_{migration.name}...")
+                start = time.perf_counter()
+                run_steps(migration)
+
+                with engine.begin() as connection:
+                    connection.execute(
+                        text("INSERT INTO schema_migration (version, name) VALUES (:version, :name)"),
+                        {"version": migration.version, "name": migration.name}
+                    )
+                    for backfill in migration.backfills:
+                        connection.execute(
+                            text("INSERT INTO backfill_progress (name) VALUES (:name) ON CONFLICT DO NOTHING"),
+                            {"name": backfill}
+                        )
+
+                required_backfills.extend(migration.backfills)
+                print(f"Applied migration {migration.version:04d}_{migration.name} in {time.perf_counter() - start:.2f}s")
+        finally:
+            lock_connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+
+    return required_backfills
+
+def get_pending_backfills() -> list[str]:
+    with engine.connect() as connection:
+        return list(connection.execute(
+            text("SELECT name FROM backfill_progress WHERE completed_at IS NULL ORDER BY name")
+        ).scalars())
+
+def run_backfill(name: str, chunk_size: int = 1000, pause_seconds: float = 0.0):
+    """
+    Run or resume a backfill in chunks of chunk_size ids, committing after
+    each chunk. Rows created after the backfill started are maintained by the
+    application and are not revisited.
+    """
+    if name not in BACKFILLS:
+        raise RuntimeError(f"Unknown backfill '{name}'. Expected one of {sorted(BACKFILLS)}")
+
+    job = BACKFILLS[name]
+
+    with engine.begin() as connection:
+        connection.execute(
+            text("INSERT INTO backfill_progress (name) VALUES (:name) ON CONFLICT DO NOTHING"),
+            {"name": name}
+        )
+        progress = connection.execute(
+            text("SELECT last_id, target_id, completed_at FROM backfill_progress WHERE name = :name"),
+            {"name": name}
+        ).one()
+
+        if progress.completed_at is not None:
+            print(f"Backfill {name} already completed")
+            return
+
+        target_id = progress.target_id
+        if target_id is None:
+            target_id = connection.execute(text(f'SELECT coalesce(max(id), 0) FROM "{job.table}"')).scalar()
+            connection.execute(
+                text("UPDATE backfill_progress SET target_id = :target WHERE name = :name"),
+                {"target": target_id, "name": name}
+            )
+
+    last_id = progress.last_id
+    start = time.perf_counter()
+    print(f"Backfill {name}: resuming after id {last_id} up to id {target_id}")
+
+    while last_id < target_id:
+        end_id = min(last_id + chunk_size, target_id)
+
+        with engine.begin() as connection:
+            connection.execute(text(job.update_sql), {"start": last_id, "end": end_id})
+            connection.execute(
+                text("UPDATE backfill_progress SET last_id = :last_id WHERE name = :name"),
+                {"last_id": end_id, "name": name}
+            )
+
+        last_id = end_id
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    with engine.begin() as connection:
+        connection.execute(
+            text("UPDATE backfill_progress SET completed_at = now() WHERE name = :name"),
+            {"name": name}
+        )
+
+    print(f"Backfill {name} completed in {time.perf_counter() - start:.2f}s")
+
+def check_migrations_applied():
+    """Fail fast if this code expects migrations the database does not have yet."""
+    with engine.connect() as connection:
+        exists = connection.execute(text("SELECT to_regclass('schema_migration')")).scalar()
+        applied = get_applied_versions(connection) if exists else set()
+
+    missing = [migration.version for migration in MIGRATIONS if migration.version not in applied]
+    if missing:
+        raise RuntimeError(
+            f"Database is missing migrations {missing}. "
+            "Run `python -m ignition-link.manage migrate` first."
+        )
@@ -57,17 +57,33 @@ class PartResponse(BaseModel):
     id: int 
     brand_id: int
     type_id: int
-    submitted_by_id: int
+    # None once the submitter's account is deleted
+    submitted_by_id: int | None
     part_name: str
     part_number: str | None
     image_url: str | None
     is_verified: bool
     description: str | None
     created_at: datetime 
+    source_url: str | None = None
 
     brand: Brand
     part_type: PartType
-    submitted_by: UserResponse
+    submitted_by: UserResponse | None
+
+class PopularPartResponse(BaseModel):
+    build_count: int
+    part: PartResponse
+
+class RelatedPartResponse(BaseModel):
+    # Builds that have both parts installed
+    co_builds: int
+    score: float
+    part: PartResponse
+
+class PopularVehicleResponse(BaseModel):
+    build_count: int
+    vehicle: VehicleResponse
 
 class BuildBasicResponse(BaseModel):
     id: int
@@ -84,6 +100,31 @@ class BuildResponse(BuildBasicResponse):
 class BuildWithPartsResponse(BuildResponse):
     parts: list[PartResponse]
 
+class PartCategoryResponse(BaseModel):
+    name: str
+    count: int
+
+class BuildDetailResponse(BuildWithPartsResponse):
+    version: int
+    part_categories: list[PartCategoryResponse]
+
+class SimilarBuildResponse(BaseModel):
+    # Estimated Jaccard similarity of the two builds' part sets
+    similarity: float
+    build: BuildResponse
+
+class ProfileResponse(BaseModel):
+    user: UserResponse
+    follower_count: int
+    following_count: int
+    post_count: int
+    build_count: int
+    # First page of each, newest first
+    posts: list[PostResponse]
+    builds: list[BuildResponse]
+    # None when the profile is viewed without signing in
+    viewer_follows: bool | None = None
+
 class UserWithBuildsResponse(UserResponse):
     builds: list[BuildBasicResponse] 
 
@@ -94,6 +135,9 @@ class PartLinkResponse(BaseModel):
     part_number: str | None
     image_url: str | None
     description: str | None
+    source_url: str | None = None
+    # Set when the link matched a part that is already in the catalogue
+    part_id: int | None = None
 
 class FollowResponse(BaseModel):
     follower_id: int
@@ -101,4 +145,42 @@ class FollowResponse(BaseModel):
     followed_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class FollowRelationshipResponse(BaseModel):
+    user_id: int
+    # Whether the current user follows user_id
+    following: bool
+    # Whether user_id follows the current user
+    followed_by: bool
+
+class FollowSuggestionResponse(BaseModel):
+    # How many of the current user's follows also follow this user
+    mutual_count: int
+    user: UserResponse
+
+class ScrapeJobResultResponse(BaseModel):
+    url: str
+    status: str
+    part: PartLinkResponse | None = None
+    part_id: int | None = None
+    error: str | None = None
+
+class ScrapeJobResponse(BaseModel):
+    id: str
+    status: str
+    build_id: int | None
+    auto_create: bool
+    total: int
+    completed: int
+    failed: int
+    created_at: datetime
+    error: str | None = None
+    results: list[ScrapeJobResultResponse]
+
+class ModerationResultResponse(BaseModel):
+    user_id: int | None = None
+    username: str | None = None
+    # deactivated, activated, deleted, unchanged, not_found, pending or error
+    status: str
+    error: str | None = None
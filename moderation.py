@@ -0,0 +1,123 @@
+from concurrent.futures import ThreadPoolExecutor
+from firebase_admin import auth, exceptions
+from sqlmodel import Session, select, or_
+from dotenv import load_dotenv
+from .database import User
+from .models import ModerationResultResponse
+from .purge import tombstone_users
+import os
+
+load_dotenv()
+
+# Concurrent Firebase Admin calls across all bulk moderation requests
+FIREBASE_MAX_WORKERS = int(os.getenv("FIREBASE_MAX_WORKERS", "8"))
+# Firebase accepts at most 100 identifiers per get_users/delete_users call
+FIREBASE_BATCH_SIZE = 100
+
+firebase_executor = ThreadPoolExecutor(
+    max_workers=FIREBASE_MAX_WORKERS, thread_name_prefix="firebase"
+)
+
+def chunked(items: list, size: int) -> list[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def resolve_users(
+    session: Session, usernames: list[str], user_ids: list[int]
+) -> tuple[list, list[ModerationResultResponse]]:
+    """
+    Look up every requested user in one query and report the ones that do not
+    exist. Plain rows are returned so worker threads never touch the session.
+    """
+    users = session.exec(
+        select(User.id, User.username, User.firebase_uid)
+        .where(or_(User.username.in_(usernames), User.id.in_(user_ids)))
+    ).all()
+
+    found_usernames = {user.username for user in users}
+    found_ids = {user.id for user in users}
+
+    missing = [
+        ModerationResultResponse(username=username, status="not_found")
+        for username in dict.fromkeys(usernames) if username not in found_usernames
+    ] + [
+        ModerationResultResponse(user_id=user_id, status="not_found")
+        for user_id in dict.fromkeys(user_ids) if user_id not in found_ids
+    ]
+
+    return users, missing
+
+def get_firebase_users(uids: list[str]) -> dict[str, auth.UserRecord]:
+    def get_chunk(chunk: list[str]) -> list[auth.UserRecord]:
+        return auth.get_users([auth.UidIdentifier(uid) for uid in chunk]).users
+
+    records = {}
+    for chunk_records in firebase_executor.map(get_chunk, chunked(uids, FIREBASE_BATCH_SIZE)):
+        records.update({record.uid: record for record in chunk_records})
+
+    return records
+
+def set_users_disabled(users: list, disabled: bool) -> list[ModerationResultResponse]:
+    """
+    Disable or re-enable Firebase accounts, skipping ones already in that
+    state. Disabled accounts also have their refresh tokens revoked.
+    """
+    records = get_firebase_users([user.firebase_uid for user in users])
+    status = "deactivated" if disabled else "activated"
+
+    def update(user) -> ModerationResultResponse:
+        result = ModerationResultResponse(user_id=user.id, username=user.username, status=status)
+
+        record = records.get(user.firebase_uid)
+        if record is None:
+            result.status = "not_found"
+            return result
+
+        if record.disabled == disabled:
+            result.status = "unchanged"
+            return result
+
+        try:
+            auth.update_user(uid=user.firebase_uid, disabled=disabled)
+            if disabled:
+                auth.revoke_refresh_tokens(uid=user.firebase_uid)
+        except exceptions.FirebaseError as e:
+            result.status = "error"
+            result.error = str(e)
+
+        return result
+
+    return list(firebase_executor.map(update, users))
+
+def delete_users(session: Session, users: list) -> list[ModerationResultResponse]:
+    """
+    Tombstone the users in one statement and delete their Firebase accounts
+    in batches. Accounts Firebase fails to delete are retried by the purge
+    worker, and are reported as pending.
+    """
+    tombstone_users(session, [user.id for user in users])
+
+    def delete_chunk(chunk: list) -> list[ModerationResultResponse]:
+        results = [
+            ModerationResultResponse(user_id=user.id, username=user.username, status="deleted")
+            for user in chunk
+        ]
+
+        try:
+            response = auth.delete_users([user.firebase_uid for user in chunk])
+        except exceptions.FirebaseError as e:
+            for result in results:
+                result.status = "pending"
+                result.error = str(e)
+            return results
+
+        for error in response.errors:
+            results[error.index].status = "pending"
+            results[error.index].error = error.reason
+
+        return results
+
+    return [
+        result
+        for chunk_results in firebase_executor.map(delete_chunk, chunked(users, FIREBASE_BATCH_SIZE))
+        for result in chunk_results
+    ]
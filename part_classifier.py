@@ -0,0 +1,228 @@
+from sqlmodel import Session, select
+from collections import Counter
+from dotenv import load_dotenv
+from .database import engine, Part, PartType
+import threading
+import math
+import os
+import re
+
+load_dotenv()
+
+# A local prediction is used without asking Gemini only when the best type's
+# cosine similarity reaches the minimum and beats the runner-up by the margin
+PART_CLASSIFIER_MIN_SIMILARITY = float(os.getenv("PART_CLASSIFIER_MIN_SIMILARITY", "0.15"))
+PART_CLASSIFIER_MIN_MARGIN = float(os.getenv("PART_CLASSIFIER_MIN_MARGIN", "0.05"))
+
+# Seed vocabulary per part type slug so the classifier works on an empty catalogue
+PART_TYPE_KEYWORDS = {
+    "brakes": [
+        "brake", "brakes", "caliper", "calipers", "rotor", "rotors", "pad", "pads",
+        "bbk", "abs", "drum", "fluid"
+    ],
+    "engine": [
+        "engine", "piston", "pistons", "camshaft", "cam", "cams", "crankshaft", "rod", "rods",
+        "gasket", "valve", "valves", "head", "block", "oil", "radiator", "clutch",
+        "flywheel", "timing", "mount", "mounts"
+    ],
+    "exhaust": [
+        "exhaust", "catback", "cat", "muffler", "downpipe", "header", "headers", "manifold",
+        "resonator", "tip", "tips", "catalytic", "midpipe", "axleback"
+    ],
+    "exterior": [
+        "bumper", "spoiler", "wing", "lip", "splitter", "diffuser", "hood", "fender",
+        "fenders", "grille", "mirror", "mirrors", "headlight", "headlights", "taillight",
+        "taillights", "skirt", "skirts", "wrap", "body", "carbon"
+    ],
+    "forced-induction": [
+        "turbo", "turbocharger", "supercharger", "intercooler", "wastegate", "blowoff",
+        "bov", "boost", "compressor", "charge", "pipe", "piping"
+    ],
+    "fueling": [
+        "fuel", "injector", "injectors", "pump", "rail", "regulator", "e85",
+        "tank", "filter"
+    ],
+    "intake": [
+        "intake", "air", "filter", "throttle", "plenum", "velocity", "stack", "airbox",
+        "snorkel", "cai"
+    ],
+    "interior": [
+        "seat", "seats", "steering", "shift", "knob", "shifter", "harness",
+        "gauge", "gauges", "mat", "mats", "dash", "pedal", "pedals", "cage"
+    ],
+    "suspension": [
+        "coilover", "coilovers", "spring", "springs", "shock", "shocks", "strut", "struts",
+        "sway", "bar", "bushing", "bushings", "arm", "arms", "camber", "lowering", "damper",
+        "dampers", "endlink", "endlinks", "brace"
+    ],
+    "tune": [
+        "tune", "tuner", "ecu", "flash", "flashpro", "accessport", "map", "software",
+        "programmer", "piggyback", "hondata", "cobb"
+    ],
+    "wheels": [
+        "wheel", "wheels", "rim", "rims", "tire", "tires", "lug", "lugs", "nut", "nuts",
+        "spacer", "spacers", "forged", "hub"
+    ],
+    "other": [],
+}
+
+# Weight of a seed keyword relative to one occurrence in a catalogued part
+KEYWORD_WEIGHT = 3.0
+
+def tokenize(text: str | None) -> list[str]:
+    if not text:
+        return []
+
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+class PartTypeClassifier:
+    """
+    TF-IDF nearest-centroid classifier over part names and descriptions.
+
+    Each part type is represented by the term counts of every catalogued part
+    of that type plus its seed keywords. A prediction is the part type whose
+    TF-IDF centroid has the highest cosine similarity with the query, reported
+    with that similarity and its margin over the second best type.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.term_counts: dict[int, Counter] = {}
+        self.doc_freq: Counter = Counter()
+        self.doc_count = 0
+        self.norms: dict[int, float] = {}
+        self.fitted = False
+        # Parts created while fit() runs, replayed once it has read the table
+        self.examples_during_fit: list[tuple[int, int, list[str]]] | None = None
+
+        self.predictions = 0
+        self.fallbacks = 0
+
+    def fit(self):
+        with self.lock:
+            self.examples_during_fit = []
+
+        try:
+            with Session(engine) as session:
+                part_types = session.exec(select(PartType.id, PartType.slug)).all()
+                parts = session.exec(
+                    select(Part.id, Part.type_id, Part.part_name, Part.description)
+                ).all()
+        except BaseException:
+            with self.lock:
+                self.examples_during_fit = None
+            raise
+
+        with self.lock:
+            self.term_counts = {type_id: Counter() for type_id, _ in part_types}
+            self.doc_freq = Counter()
+            self.doc_count = 0
+
+            for type_id, slug in part_types:
+                keywords = PART_TYPE_KEYWORDS.get(slug, [])
+                if not keywords:
+                    continue
+
+                for keyword in keywords:
+                    self.term_counts[type_id][keyword] += KEYWORD_WEIGHT
+                self.doc_freq.update(set(keywords))
+                self.doc_count += 1
+
+            for _, type_id, part_name, description in parts:
+                self._add(type_id, tokenize(part_name) + tokenize(description))
+
+            # Skip the ones committed early enough for the read above to see
+            fitted_part_ids = {part_id for part_id, _, _, _ in parts}
+            for part_id, type_id, tokens in self.examples_during_fit:
+                if part_id not in fitted_part_ids:
+                    self._add(type_id, tokens)
+            self.examples_during_fit = None
+
+            self.norms = {}
+            self.fitted = True
+
+        print(f"Part type classifier trained on {len(parts)} parts across {len(part_types)} types")
+
+    def add_example(self, part_id: int, type_id: int, part_name: str, description: str | None = None):
+        tokens = tokenize(part_name) + tokenize(description)
+
+        with self.lock:
+            if self.examples_during_fit is not None:
+                self.examples_during_fit.append((part_id, type_id, tokens))
+            elif self.fitted:
+                self._add(type_id, tokens)
+                self.norms = {}
+            # Before the first fit starts, fit() reads the part from the table
+
+    def _add(self, type_id: int, tokens: list[str]):
+        if not tokens:
+            return
+
+        self.term_counts.setdefault(type_id, Counter()).update(tokens)
+        self.doc_freq.update(set(tokens))
+        self.doc_count += 1
+
+    def _idf(self, term: str) -> float:
+        return math.log((self.doc_count + 1) / (self.doc_freq[term] + 1)) + 1
+
+    def _norm(self, type_id: int) -> float:
+        if type_id not in self.norms:
+            self.norms[type_id] = math.sqrt(sum(
+                (count * self._idf(term)) ** 2
+                for term, count in self.term_counts[type_id].items()
+            ))
+
+        return self.norms[type_id]
+
+    def predict(
+        self, part_name: str | None, description: str | None = None
+    ) -> tuple[int | None, float, float]:
+        query = Counter(tokenize(part_name) + tokenize(description))
+        if not query:
+            return None, 0.0, 0.0
+
+        # Trained by a background task at startup; until then every part is
+        # left to the Gemini fallback rather than scanning the table here
+        if not self.fitted:
+            return None, 0.0, 0.0
+
+        with self.lock:
+            query_weights = {term: tf * self._idf(term) for term, tf in query.items()}
+            query_norm = math.sqrt(sum(weight ** 2 for weight in query_weights.values()))
+
+            scores = {}
+            for type_id, counts in self.term_counts.items():
+                type_norm = self._norm(type_id)
+                if not type_norm:
+                    continue
+
+                dot = sum(
+                    weight * counts[term] * self._idf(term)
+                    for term, weight in query_weights.items()
+                    if term in counts
+                )
+                if dot:
+                    scores[type_id] = dot / (query_norm * type_norm)
+
+        if not scores:
+            return None, 0.0, 0.0
+
+        ranked = sorted(scores.values(), reverse=True)
+        best_type_id = max(scores, key=scores.get)
+        margin = ranked[0] - (ranked[1] if len(ranked) > 1 else 0.0)
+
+        return best_type_id, ranked[0], margin
+
+    def record_prediction(self, used_fallback: bool):
+        self.predictions += 1
+        if used_fallback:
+            self.fallbacks += 1
+
+        fallback_rate = self.fallbacks / self.predictions * 100
+        print(
+            f"Part type classifier fallback rate: {fallback_rate:.1f}% "
+            f"({self.fallbacks}/{self.predictions} sent to Gemini)"
+        )
+
+# Shared instance trained at startup and updated as parts are created
+part_type_classifier = PartTypeClassifier()
@@ -0,0 +1,89 @@
+from sqlmodel import Session, select, func
+from sqlalchemy.orm import contains_eager, joinedload
+from .database import engine, User, Post, Build
+from .models import UserResponse, PostResponse, BuildResponse
+from .dependencies import verify_optional_session_cookie
+from .follow_graph import follow_graph
+import asyncio
+
+# The profile is read on one pooled connection while the viewer's session
+# cookie is verified with Firebase alongside it, so a profile view never
+# holds more than one connection at a time
+
+def load_profile(user_id: int, limit: int) -> dict | None:
+    with Session(engine) as session:
+        user = session.exec(
+            select(User)
+            .where(User.id == user_id)
+        ).first()
+
+        if user is None:
+            return None
+
+        build_count = session.exec(
+            select(func.count())
+            .select_from(Build)
+            .where(Build.user_id == user_id)
+        ).one()
+
+        posts = session.exec(
+            select(Post)
+            # Joining the author leaves out posts of deleted accounts
+            .join(User, Post.user_id == User.id)
+            .where(Post.user_id == user_id)
+            .options(contains_eager(Post.user))
+            .order_by(Post.created_at.desc())
+            .limit(limit)
+        ).all()
+
+        builds = session.exec(
+            select(Build)
+            # Joining the owner leaves out builds of deleted accounts
+            .join(User, Build.user_id == User.id)
+            .where(Build.user_id == user_id)
+            .options(contains_eager(Build.owner), joinedload(Build.vehicle))
+            .order_by(Build.id.desc())
+            .limit(limit)
+        ).all()
+
+        return {
+            "user": UserResponse.model_validate(user),
+            "follower_count": user.follower_count,
+            "following_count": user.following_count,
+            "post_count": user.post_count,
+            "build_count": build_count,
+            "posts": [PostResponse.model_validate(post, from_attributes=True) for post in posts],
+            "builds": [BuildResponse.model_validate(build, from_attributes=True) for build in builds],
+        }
+
+def load_viewer_follows(user_id: int, viewer_uid: str) -> bool | None:
+    with Session(engine) as session:
+        viewer = session.exec(
+            select(User).where(User.firebase_uid == viewer_uid)
+        ).first()
+        if viewer is None:
+            return None
+
+        follow_graph.ensure_fresh(session, viewer.id, viewer.following_count, viewer.follower_count)
+
+    _, following, _ = follow_graph.relationships(viewer.id, [user_id])[0]
+    return following
+
+async def get_profile(user_id: int, session_cookie: str | None, limit: int) -> dict | None:
+    """
+    User card, counts, first page of posts and builds, and whether the viewer
+    follows the user. None if the user does not exist.
+    """
+    profile, viewer_uid = await asyncio.gather(
+        asyncio.to_thread(load_profile, user_id, limit),
+        asyncio.to_thread(verify_optional_session_cookie, session_cookie),
+    )
+
+    if profile is None:
+        return None
+
+    viewer_follows = None
+    if viewer_uid is not None:
+        viewer_follows = await asyncio.to_thread(load_viewer_follows, user_id, viewer_uid)
+
+    return {**profile, "viewer_follows": viewer_follows}
@@ -0,0 +1,143 @@
+from sqlalchemy import text
+from sqlmodel import Session, update
+from datetime import datetime, timezone
+from firebase_admin import auth, exceptions
+from dotenv import load_dotenv
+from .database import engine, User, Post
+from .usernames import username_index
+import time
+import os
+
+load_dotenv()
+
+# How often the purge worker looks for tombstoned users and posts
+PURGE_INTERVAL_SECONDS = float(os.getenv("PURGE_INTERVAL_SECONDS", "30"))
+# Rows deleted per transaction, which bounds how long row locks are held
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "500"))
+PURGE_BATCH_PAUSE_SECONDS = float(os.getenv("PURGE_BATCH_PAUSE_SECONDS", "0.05"))
+
+# Only one worker process purges at a time
+PURGE_LOCK_ID = 741_303
+
+# Rows that reference a post or user, deleted before the row itself so the
+# final delete has nothing left to cascade to. Parts a user submitted are
+# catalogue data and stay; deleting the user clears their submitted_by_id
+POST_DEPENDENTS = [
+    ("like", "post_id = :id"),
+    ("comment", "post_id = :id"),
+]
+
+USER_DEPENDENTS = [
+    ("like", "user_id = :id"),
+    ("like", "post_id IN (SELECT id FROM post WHERE user_id = :id)"),
+    ("comment", "user_id = :id"),
+    ("comment", "post_id IN (SELECT id FROM post WHERE user_id = :id)"),
+    ("follow", "follower_id = :id"),
+    ("follow", "following_id = :id"),
+    ("buildpartlink", "build_id IN (SELECT id FROM build WHERE user_id = :id)"),
+    ("build", "user_id = :id"),
+    ("post", "user_id = :id"),
+]
+
+def tombstone_user(session: Session, user_id: int):
+    """Hide a user from every read; the purge worker deletes their data later."""
+    tombstone_users(session, [user_id])
+
+def tombstone_users(session: Session, user_ids: list[int]):
+    session.exec(
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(deleted_at=datetime.now(timezone.utc))
+    )
+    session.commit()
+
+def tombstone_post(session: Session, post_id: int):
+    """Hide a post from every read; the purge worker deletes it later."""
+    session.exec(
+        update(Post)
+        .where(Post.id == post_id)
+        .values(deleted_at=datetime.now(timezone.utc))
+    )
+    session.commit()
+
+def delete_in_batches(table: str, condition: str, entity_id: int) -> int:
+    total = 0
+
+    while True:
+        with engine.begin() as connection:
+            deleted = connection.execute(
+                text(
+                    f'DELETE FROM "{table}" WHERE ctid = ANY(ARRAY('
+                    f'SELECT ctid FROM "{table}" WHERE {condition} LIMIT :limit))'
+                ),
+                {"id": entity_id, "limit": PURGE_BATCH_SIZE}
+            ).rowcount
+
+        total += deleted
+        if deleted < PURGE_BATCH_SIZE:
+            return total
+
+        time.sleep(PURGE_BATCH_PAUSE_SECONDS)
+
+def purge_post(post_id: int):
+    for table, condition in POST_DEPENDENTS:
+        delete_in_batches(table, condition, post_id)
+
+    with engine.begin() as connection:
+        connection.execute(
+            text("DELETE FROM post WHERE id = :id AND deleted_at IS NOT NULL"),
+            {"id": post_id}
+        )
+
+def purge_user(user_id: int, firebase_uid: str, username: str) -> bool:
+    """
+    Delete a tombstoned user's data, their Firebase account and finally the
+    user row. Returns False if Firebase could not be reached; the row is kept
+    so the next run retries.
+    """
+    deleted = sum(
+        delete_in_batches(table, condition, user_id) for table, condition in USER_DEPENDENTS
+    )
+
+    try:
+        auth.delete_user(firebase_uid)
+    except auth.UserNotFoundError:
+        pass
+    except exceptions.FirebaseError as e:
+        print(f"Failed to delete Firebase user {firebase_uid}, retrying later: {e}")
+        return False
+
+    with engine.begin() as connection:
+        connection.execute(
+            text('DELETE FROM "user" WHERE id = :id AND deleted_at IS NOT NULL'),
+            {"id": user_id}
+        )
+    username_index.discard(username)
+
+    print(f"Purged user {user_id} and {deleted} dependent rows")
+    return True
+
+def purge_tombstoned():
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_connection:
+        acquired = lock_connection.execute(
+            text("SELECT pg_try_advisory_lock(:id)"), {"id": PURGE_LOCK_ID}
+        ).scalar()
+        if not acquired:
+            return
+
+        try:
+            with engine.connect() as connection:
+                post_ids = connection.execute(
+                    text("SELECT id FROM post WHERE deleted_at IS NOT NULL ORDER BY deleted_at")
+                ).scalars().all()
+                users = connection.execute(
+                    text('SELECT id, firebase_uid, username FROM "user" WHERE deleted_at IS NOT NULL ORDER BY deleted_at')
+                ).all()
+
+            for post_id in post_ids:
+                purge_post(post_id)
+
+            for user in users:
+                purge_user(user.id, user.firebase_uid, user.username)
+        finally:
+            lock_connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": PURGE_LOCK_ID})
@@ -0,0 +1,262 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from scipy import sparse
+from itertools import chain
+from dotenv import load_dotenv
+from .database import engine
+import numpy as np
+import threading
+import time
+import os
+
+load_dotenv()
+
+# Related parts kept per part
+RELATED_PARTS_TOP_K = int(os.getenv("RELATED_PARTS_TOP_K", "20"))
+# Pairs installed together on fewer builds than this are treated as noise
+RELATED_PARTS_MIN_CO_BUILDS = int(os.getenv("RELATED_PARTS_MIN_CO_BUILDS", "2"))
+# How often changed parts are rescored and each worker reloads the results
+RELATED_PARTS_REFRESH_SECONDS = float(os.getenv("RELATED_PARTS_REFRESH_SECONDS", "600"))
+
+# Parts scored per sparse product, which bounds the size of the product
+RELATED_PARTS_CHUNK_SIZE = 2000
+# Rows fetched per round trip when loading buildpartlink
+LINK_FETCH_SIZE = 50_000
+
+# Only one worker process rescores at a time
+RELATED_PARTS_LOCK_ID = 741_305
+
+class LinkMatrix:
+    """
+    Sparse build x part incidence matrix of every buildpartlink row. Columns
+    are the parts with at least one build, in part_ids order.
+    """
+
+    def __init__(self, links: np.ndarray):
+        build_ids, build_rows = np.unique(links[:, 0], return_inverse=True)
+        self.part_ids, part_columns = np.unique(links[:, 1], return_inverse=True)
+
+        self.by_build = sparse.csr_matrix(
+            (np.ones(len(links), dtype=np.int32), (build_rows, part_columns)),
+            shape=(len(build_ids), len(self.part_ids))
+        )
+        self.by_part = self.by_build.tocsc()
+        self.build_counts = np.bincount(part_columns, minlength=len(self.part_ids))
+
+    def columns_of(self, part_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Split part_ids into matrix columns for linked parts and the ids of unlinked ones."""
+        if len(self.part_ids) == 0:
+            return np.array([], dtype=np.int64), part_ids
+
+        positions = np.minimum(np.searchsorted(self.part_ids, part_ids), len(self.part_ids) - 1)
+        linked = self.part_ids[positions] == part_ids
+
+        return positions[linked], part_ids[~linked]
+
+    def score(self, columns: np.ndarray) -> dict[str, list]:
+        """
+        Top co-occurring parts for each column, scored by cosine similarity
+        of the parts' build vectors: co_builds / sqrt(builds_a * builds_b).
+        """
+        # Row i holds how many builds share each part with columns[i]
+        co_occurrence = (self.by_part[:, columns].T @ self.by_build).tocsr()
+
+        rows = {"part_ids": [], "related_part_ids": [], "co_builds": [], "scores": []}
+        for i, column in enumerate(columns):
+            start, end = co_occurrence.indptr[i], co_occurrence.indptr[i + 1]
+            related = co_occurrence.indices[start:end]
+            co_builds = co_occurrence.data[start:end]
+
+            keep = (related != column) & (co_builds >= RELATED_PARTS_MIN_CO_BUILDS)
+            related, co_builds = related[keep], co_builds[keep]
+            if len(related) == 0:
+                continue
+
+            scores = co_builds / np.sqrt(
+                self.build_counts[column] * self.build_counts[related].astype(np.float64)
+            )
+
+            top = np.arange(len(scores))
+            if len(scores) > RELATED_PARTS_TOP_K:
+                top = np.argpartition(-scores, RELATED_PARTS_TOP_K - 1)[:RELATED_PARTS_TOP_K]
+            top = top[np.argsort(-scores[top], kind="stable")]
+
+            rows["part_ids"].extend([int(self.part_ids[column])] * len(top))
+            rows["related_part_ids"].extend(self.part_ids[related[top]].tolist())
+            rows["co_builds"].extend(co_builds[top].tolist())
+            rows["scores"].extend(scores[top].tolist())
+
+        return rows
+
+def load_link_matrix(connection: Connection) -> LinkMatrix:
+    result = connection.execution_options(yield_per=LINK_FETCH_SIZE).execute(
+        text("SELECT build_id, part_id FROM buildpartlink")
+    )
+    links = np.fromiter(chain.from_iterable(result), dtype=np.int64).reshape(-1, 2)
+
+    return LinkMatrix(links)
+
+def replace_related_parts(connection: Connection, part_ids: list[int], rows: dict[str, list]):
+    connection.execute(
+        text("DELETE FROM relatedpart WHERE part_id = ANY(:part_ids)"), {"part_ids": part_ids}
+    )
+    # Parts deleted since the matrix was loaded are skipped
+    connection.execute(
+        text(
+            "INSERT INTO relatedpart (part_id, related_part_id, co_builds, score) "
+            "SELECT r.part_id, r.related_part_id, r.co_builds, r.score FROM unnest("
+            "CAST(:part_ids AS integer[]), CAST(:related_part_ids AS integer[]), "
+            "CAST(:co_builds AS integer[]), CAST(:scores AS double precision[])"
+            ") AS r (part_id, related_part_id, co_builds, score) "
+            "WHERE EXISTS (SELECT 1 FROM part WHERE part.id = r.part_id) "
+            "AND EXISTS (SELECT 1 FROM part WHERE part.id = r.related_part_id)"
+        ),
+        rows
+    )
+
+def claim_dirty_parts(full: bool) -> list[int]:
+    with engine.begin() as connection:
+        if full:
+            connection.execute(text(
+                "INSERT INTO relatedpartdirty (part_id) "
+                "SELECT DISTINCT part_id FROM buildpartlink ON CONFLICT DO NOTHING"
+            ))
+            connection.execute(text(
+                "DELETE FROM relatedpart r "
+                "WHERE NOT EXISTS (SELECT 1 FROM buildpartlink l WHERE l.part_id = r.part_id)"
+            ))
+
+        # Claimed before the links are read, so a change committed after this
+        # point queues its parts again for the next run
+        return list(connection.execute(
+            text("DELETE FROM relatedpartdirty RETURNING part_id")
+        ).scalars())
+
+def requeue_dirty_parts(part_ids: list[int]):
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO relatedpartdirty (part_id) "
+                "SELECT unnest(CAST(:part_ids AS integer[])) ON CONFLICT DO NOTHING"
+            ),
+            {"part_ids": part_ids}
+        )
+
+def rescore_parts(part_ids: list[int]) -> int:
+    with engine.connect() as connection:
+        matrix = load_link_matrix(connection)
+
+    columns, unlinked = matrix.columns_of(np.array(sorted(part_ids), dtype=np.int64))
+    written = 0
+
+    for start in range(0, len(columns), RELATED_PARTS_CHUNK_SIZE):
+        chunk = columns[start:start + RELATED_PARTS_CHUNK_SIZE]
+        rows = matrix.score(chunk)
+
+        with engine.begin() as connection:
+            replace_related_parts(connection, matrix.part_ids[chunk].tolist(), rows)
+        written += len(rows["part_ids"])
+
+    # Parts left in no build have nothing to recommend
+    if len(unlinked):
+        with engine.begin() as connection:
+            connection.execute(
+                text("DELETE FROM relatedpart WHERE part_id = ANY(:part_ids)"),
+                {"part_ids": unlinked.tolist()}
+            )
+
+    return written
+
+def update_related_parts(full: bool = False):
+    """
+    Rescore the parts whose builds changed since the last run, or every
+    linked part when full is set. Claimed parts are queued again if the run
+    fails. An incremental run leaves the scores other parts give to the
+    changed ones slightly stale until they are rescored themselves or a full
+    run is made.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_connection:
+        acquired = lock_connection.execute(
+            text("SELECT pg_try_advisory_lock(:id)"), {"id": RELATED_PARTS_LOCK_ID}
+        ).scalar()
+        if not acquired:
+            return
+
+        try:
+            start = time.perf_counter()
+            part_ids = claim_dirty_parts(full)
+            if not part_ids:
+                return
+
+            try:
+                written = rescore_parts(part_ids)
+            except Exception:
+                requeue_dirty_parts(part_ids)
+                raise
+
+            print(
+                f"Rescored related parts for {len(part_ids)} parts in "
+                f"{time.perf_counter() - start:.2f}s: {written} recommendations written"
+            )
+        finally:
+            lock_connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": RELATED_PARTS_LOCK_ID})
+
+class RelatedPartsIndex:
+    """
+    Every part's recommendations held in flat arrays sorted by part and then
+    by descending score; a part's slice is found by binary search.
+    """
+
+    def __init__(self):
+        empty = np.array([], dtype=np.int64)
+        self.arrays = (empty, np.zeros(1, dtype=np.int64), empty, empty, np.array([], dtype=np.float32))
+        self.lock = threading.Lock()
+
+    def load(self):
+        start = time.perf_counter()
+
+        with engine.connect() as connection:
+            rows = connection.execute(
+                text("SELECT part_id, related_part_id, co_builds, score FROM relatedpart")
+            ).all()
+
+        columns = list(zip(*rows)) or [(), (), (), ()]
+        part_ids = np.array(columns[0], dtype=np.int64)
+        related_part_ids = np.array(columns[1], dtype=np.int64)
+        co_builds = np.array(columns[2], dtype=np.int32)
+        scores = np.array(columns[3], dtype=np.float32)
+
+        order = np.lexsort((-scores, part_ids))
+        part_ids, related_part_ids = part_ids[order], related_part_ids[order]
+        co_builds, scores = co_builds[order], scores[order]
+
+        keys, offsets = np.unique(part_ids, return_index=True)
+        offsets = np.append(offsets, len(part_ids))
+
+        # Swap every array at once so readers never mix two loads
+        with self.lock:
+            self.arrays = (keys, offsets, related_part_ids, co_builds, scores)
+
+        print(f"Loaded {len(rows)} related parts for {len(keys)} parts in {time.perf_counter() - start:.2f}s")
+
+    def get(self, part_id: int, limit: int = RELATED_PARTS_TOP_K) -> list[tuple[int, int, float]]:
+        """(related_part_id, co_builds, score) for part_id, best first."""
+        with self.lock:
+            keys, offsets, related_part_ids, co_builds, scores = self.arrays
+
+        position = np.searchsorted(keys, part_id)
+        if position == len(keys) or keys[position] != part_id:
+            return []
+
+        start = offsets[position]
+        end = min(offsets[position + 1], start + limit)
+
+        return list(zip(
+            related_part_ids[start:end].tolist(), co_builds[start:end].tolist(), scores[start:end].tolist()
+        ))
+
+related_parts_index = RelatedPartsIndex()
+
+def refresh_related_parts():
+    update_related_parts()
+    related_parts_index.load()
@@ -0,0 +1,75 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from .database import engine
+import time
+
+# Only one worker process rebuilds at a time
+ROLLUP_LOCK_ID = 741_304
+
+# Each rollup is upserted from a fresh aggregate, touching only rows whose
+# count changed, and rows with nothing left to count are dropped
+REBUILD_STATEMENTS = [
+    """
+    INSERT INTO vehiclebuildcount (vehicle_id, build_count)
+    SELECT vehicle_id, count(*) FROM build GROUP BY vehicle_id
+    ON CONFLICT (vehicle_id) DO UPDATE SET build_count = EXCLUDED.build_count
+    WHERE vehiclebuildcount.build_count <> EXCLUDED.build_count
+    """,
+    """
+    DELETE FROM vehiclebuildcount c
+    WHERE NOT EXISTS (SELECT 1 FROM build b WHERE b.vehicle_id = c.vehicle_id)
+    """,
+    """
+    INSERT INTO partbuildcount (part_id, build_count)
+    SELECT part_id, count(*) FROM buildpartlink GROUP BY part_id
+    ON CONFLICT (part_id) DO UPDATE SET build_count = EXCLUDED.build_count
+    WHERE partbuildcount.build_count <> EXCLUDED.build_count
+    """,
+    """
+    DELETE FROM partbuildcount c
+    WHERE NOT EXISTS (SELECT 1 FROM buildpartlink l WHERE l.part_id = c.part_id)
+    """,
+    """
+    INSERT INTO vehiclepartcount (vehicle_id, part_id, build_count)
+    SELECT b.vehicle_id, l.part_id, count(*)
+    FROM buildpartlink l JOIN build b ON b.id = l.build_id
+    GROUP BY b.vehicle_id, l.part_id
+    ON CONFLICT (vehicle_id, part_id) DO UPDATE SET build_count = EXCLUDED.build_count
+    WHERE vehiclepartcount.build_count <> EXCLUDED.build_count
+    """,
+    """
+    DELETE FROM vehiclepartcount c
+    WHERE NOT EXISTS (
+        SELECT 1 FROM buildpartlink l JOIN build b ON b.id = l.build_id
+        WHERE b.vehicle_id = c.vehicle_id AND l.part_id = c.part_id
+    )
+    """,
+]
+
+def rebuild_rollup_tables(connection: Connection) -> int:
+    """Recompute every rollup inside the caller's transaction and return the rows changed."""
+    return sum(connection.execute(text(statement)).rowcount for statement in REBUILD_STATEMENTS)
+
+def rebuild_rollups():
+    """
+    Rebuild the rollups under an exclusive lock on the rollup tables. Build and
+    part link writes wait on the lock while the rebuild runs, so no increment
+    made by a trigger during the rebuild is lost. Triggers keep the rollups
+    current, so this only corrects drift and runs on demand (manage rollups).
+    """
+    start = time.perf_counter()
+
+    with engine.begin() as connection:
+        acquired = connection.execute(
+            text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": ROLLUP_LOCK_ID}
+        ).scalar()
+        if not acquired:
+            return
+
+        connection.execute(text("SET LOCAL lock_timeout = '5s'"))
+        connection.execute(text(
+            "LOCK TABLE vehiclebuildcount, partbuildcount, vehiclepartcount IN EXCLUSIVE MODE"
+        ))
+        changed = rebuild_rollup_tables(connection)
+
+    print(f"Rebuilt popularity rollups in {time.perf_counter() - start:.2f}s: {changed} rows corrected")
@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.encoders import jsonable_encoder
 from firebase_admin import auth, exceptions
-from typing import Annotated
+from typing import Annotated, Literal
 from sqlmodel import select, Session
 from ..database import Post, User
-from ..models import UserResponse
+from ..purge import tombstone_user, tombstone_post
+from ..exports import export_ndjson, export_csv
+from ..moderation import resolve_users, set_users_disabled, delete_users
+from pydantic import BaseModel, Field
+from ..models import UserResponse, ModerationResultResponse
 from ..dependencies import (
     get_session, encode_model_to_json, get_current_user_is_admin
 )
@@ -35,8 +39,8 @@ def delete_post_by_id(
             detail=f"No post found with id {post_id}"
         )
 
-    session.delete(post)
-    session.commit()
+    # Hidden immediately; likes and comments are purged in the background
+    tombstone_post(session, post.id)
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -62,11 +66,9 @@ def delete_user_by_username(
             detail=f"No user found with username {username}"
         )
 
-    # Delete user from Firebase first
-    auth.delete_user(user_to_delete.firebase_uid)
-
-    session.delete(user_to_delete)
-    session.commit()
+    # Hidden immediately; the purge worker deletes the user's content and
+    # Firebase account in the background
+    tombstone_user(session, user_to_delete.id)
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -165,3 +167,90 @@ def get_all_users(
             ]
         }
     )
+
+@router.get("/export/{resource}")
+def export_resource(
+    resource: Literal["users", "parts", "builds", "posts"],
+    current_admin: CurrentUserAdminDep,
+    format: Literal["ndjson", "csv"] = "ndjson"
+):
+    # Rows are streamed from a server-side cursor, so memory stays flat however
+    # large the table is
+    if format == "csv":
+        content, media_type = export_csv(resource), "text/csv"
+    else:
+        content, media_type = export_ndjson(resource), "application/x-ndjson"
+
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{resource}.{format}"'}
+    )
+
+class BulkModerationRequest(BaseModel):
+    usernames: list[str] = Field(default_factory=list, max_length=1000)
+    user_ids: list[int] = Field(default_factory=list, max_length=1000)
+
+def moderate_users(
+    request: BulkModerationRequest,
+    current_admin: User,
+    session: Session,
+    action
+) -> list[ModerationResultResponse]:
+    if not request.usernames and not request.user_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide at least one username or user id"
+        )
+
+    users, results = resolve_users(session, request.usernames, request.user_ids)
+
+    # Admins cannot moderate their own account in bulk
+    results += [
+        ModerationResultResponse(
+            user_id=user.id, username=user.username, status="error",
+            error="Cannot moderate your own account"
+        )
+        for user in users if user.id == current_admin.id
+    ]
+    users = [user for user in users if user.id != current_admin.id]
+
+    try:
+        results += action(users) if users else []
+    except exceptions.FirebaseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Firebase request failed: {str(e)}"
+        )
+
+    return results
+
+@router.post("/bulk/deactivate-users", response_model=list[ModerationResultResponse])
+def bulk_deactivate_users(
+    request: BulkModerationRequest,
+    current_admin: CurrentUserAdminDep,
+    session: SessionDep
+):
+    return moderate_users(
+        request, current_admin, session, lambda users: set_users_disabled(users, disabled=True)
+    )
+
+@router.post("/bulk/activate-users", response_model=list[ModerationResultResponse])
+def bulk_activate_users(
+    request: BulkModerationRequest,
+    current_admin: CurrentUserAdminDep,
+    session: SessionDep
+):
+    return moderate_users(
+        request, current_admin, session, lambda users: set_users_disabled(users, disabled=False)
+    )
+
+@router.post("/bulk/delete-users", response_model=list[ModerationResultResponse])
+def bulk_delete_users(
+    request: BulkModerationRequest,
+    current_admin: CurrentUserAdminDep,
+    session: SessionDep
+):
+    return moderate_users(
+        request, current_admin, session, lambda users: delete_users(session, users)
+    )
@@ -5,68 +5,82 @@ from fastapi.responses import JSONResponse
 from firebase_admin import auth, exceptions
 from typing import Annotated
 from ..database import User
-from sqlmodel import select, Session
+from sqlmodel import select, Session, or_
 from pydantic import BaseModel
 import datetime
-from .validation import check_username_exists
+from ..usernames import username_index
+from sqlalchemy.dialects.postgresql import insert
 from ..dependencies import (
     verify_firebase_token, verify_firebase_session_cookie,
-    load_admin_emails, get_session
+    admin_roster, get_session, oauth2_scheme
 )
 
 router = APIRouter()
 
 # Dependency injections
 TokenDep = Annotated[dict, Depends(verify_firebase_token)]
+RawTokenDep = Annotated[str, Depends(oauth2_scheme)]
 CookieDep = Annotated[dict, Depends(verify_firebase_session_cookie)]
 SessionDep = Annotated[Session, Depends(get_session)]
 
 class SignUpRequest(BaseModel):
     username: str
 
+def raise_signup_conflict(session: Session, new_user: User):
+    # Only reached when the insert hit a unique constraint
+    existing = session.exec(
+        select(User.firebase_uid, User.username)
+        .where(or_(
+            User.firebase_uid == new_user.firebase_uid,
+            User.username == new_user.username,
+            User.email == new_user.email
+        ))
+        .execution_options(include_deleted=True)
+    ).all()
+
+    if any(user.firebase_uid == new_user.firebase_uid for user in existing):
+        raise HTTPException(status_code=400, detail="User already exists.")
+    if any(user.username == new_user.username for user in existing):
+        raise HTTPException(status_code=400, detail="Username is already taken.")
+
+    raise HTTPException(status_code=400, detail="Email is already registered.")
+
 @router.post("/signup")
 def register_user(
     request: SignUpRequest,
-    token: TokenDep, 
+    decoded_token: TokenDep,
     session: SessionDep,
 ):
-    # Check if the username is already taken
-    username_taken = check_username_exists(request.username, session)
-
-    if username_taken:
-        raise HTTPException(status_code=400, detail="Username is already taken.")
-
-    decoded_token = auth.verify_id_token(token)
-    firebase_user = auth.get_user(uid=decoded_token['uid'])
+    email = decoded_token.get("email")
+    if not email:
+        raise HTTPException(status_code=400, detail="Firebase account has no email address.")
 
-    # Check if user with the same firebase_uid already exists
-    existing_user = session.exec(
-        select(User).where(User.firebase_uid == decoded_token['uid'])
-    ).first()
-
-    if existing_user:
-        raise HTTPException(status_code=400, detail="User already exists.")
-
-    # Set admin role 
-    admin_emails = load_admin_emails()
-    is_admin = firebase_user.email in admin_emails
-
-    # Create new user
     new_user = User(
         firebase_uid=decoded_token['uid'],
         username=request.username,
-        email=firebase_user.email,
-        is_admin=is_admin
+        email=email,
+        is_admin=admin_roster.is_admin(email)
     )
 
+    # One insert guarded by the unique constraints on uid, username and email
     try:
-        session.add(new_user)
+        new_user_id = session.exec(
+            insert(User)
+            .values(**new_user.model_dump(exclude={"id"}))
+            .on_conflict_do_nothing()
+            .returning(User.id)
+        ).scalar()
         session.commit()
-        session.refresh(new_user)
     except Exception as e:
         session.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+    if new_user_id is None:
+        raise_signup_conflict(session, new_user)
+
+    new_user.id = new_user_id
+    username_index.add(new_user.username)
+
     return JSONResponse(
         status_code=201,  
         content={
@@ -78,7 +92,7 @@ def register_user(
 
 @router.post("/session-login")
 async def session_login(
-    token: TokenDep
+    token: RawTokenDep
 ):
     # Set session expiration to 5 days.
     expires_in = datetime.timedelta(days=5)
@@ -1,12 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.responses import JSONResponse
 from typing import Annotated
-from sqlmodel import select, Session, func
-from sqlalchemy.orm import selectinload
-from pydantic import BaseModel
+from sqlmodel import select, Session, func, update, delete
+from sqlalchemy import bindparam, literal, any_, all_, Integer
+from sqlalchemy.dialects.postgresql import insert, ARRAY
+from sqlalchemy.orm import selectinload, contains_eager, joinedload
+from pydantic import BaseModel, Field
 from datetime import datetime, timezone 
 from ..database import User, Vehicle, Build, Part, PartType, BuildPartLink
-from ..models import BuildResponse, BuildWithPartsResponse
+from ..models import BuildResponse, BuildWithPartsResponse, BuildDetailResponse, SimilarBuildResponse
+from ..build_details import get_build_detail, get_build_version, bump_build_version
+from ..similar_builds import similar_builds_index
 from ..dependencies import (
     get_session, get_user_from_cookie, encode_model_to_json
 )
@@ -53,6 +57,8 @@ def get_all_builds(
 ):
     builds_list = session.exec(
         select(Build)
+        # Joining the owner leaves out builds of deleted accounts
+        .join(User, Build.user_id == User.id)
         .offset(offset)
         .limit(limit)
         .order_by(Build.id.desc())
@@ -122,6 +128,7 @@ def edit_build_info(
 
     # update build object with new edit data
     build_to_edit.sqlmodel_update(build_data)
+    bump_build_version(build_to_edit)
 
     session.add(build_to_edit)
     session.commit()
@@ -136,6 +143,7 @@ def get_build_from_build_id(
 ):
     build = session.exec(
         select(Build)
+        .join(User, Build.user_id == User.id)
         .where(Build.id == build_id)
     ).first()
 
@@ -147,6 +155,61 @@ def get_build_from_build_id(
 
     return build
 
+@router.get("/{build_id}/detail", response_model=BuildDetailResponse)
+def get_build_detail_by_id(
+    build_id: int,
+    session: SessionDep
+):
+    # Everything a build page needs, assembled from a fixed number of queries
+    # and cached until the build's version changes
+    detail = get_build_detail(session, build_id)
+
+    if detail is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Failed to retrieve build. Build with id {build_id} does not exist."
+        )
+
+    return JSONResponse(status_code=status.HTTP_200_OK, content=detail)
+
+@router.get("/{build_id}/similar", response_model=list[SimilarBuildResponse])
+def get_similar_builds(
+    build_id: int,
+    session: SessionDep,
+    same_vehicle: bool = False,
+    limit: Annotated[int, Query(le=50)] = 10,
+):
+    version = get_build_version(session, build_id)
+
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Failed to retrieve build. Build with id {build_id} does not exist."
+        )
+
+    # The queried build is always current; others catch up on the next sync
+    if similar_builds_index.version_of(build_id) != version:
+        similar_builds_index.refresh_build(session, build_id)
+
+    similar = similar_builds_index.similar(build_id, limit, same_vehicle)
+    if not similar:
+        return []
+
+    builds = session.exec(
+        select(Build)
+        # Joining the owner leaves out builds of deleted accounts
+        .join(User, Build.user_id == User.id)
+        .where(Build.id.in_([similar_build_id for similar_build_id, _ in similar]))
+        .options(contains_eager(Build.owner), joinedload(Build.vehicle))
+    ).all()
+    builds_by_id = {build.id: build for build in builds}
+
+    return [
+        {"similarity": similarity, "build": builds_by_id[similar_build_id]}
+        for similar_build_id, similarity in similar
+        if similar_build_id in builds_by_id
+    ]
+
 @router.delete("/{build_id}")
 def delete_build_by_id(
     build_id: int,
@@ -172,6 +235,7 @@ def delete_build_by_id(
     
     session.delete(build_to_delete)
     session.commit()
+    similar_builds_index.discard(build_id)
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -190,6 +254,7 @@ def get_builds_from_user_id(
 ):
     builds_from_user_id = session.exec(
         select(Build)
+        .join(User, Build.user_id == User.id)
         .where(Build.user_id == user_id)
         .order_by(Build.id.asc())
         .offset(offset)
@@ -246,10 +311,12 @@ def remove_part_from_build(
         )
     
     build_to_edit.parts.remove(part_to_remove)
+    bump_build_version(build_to_edit)
 
     session.add(build_to_edit)
     session.commit()
     session.refresh(build_to_edit)
+    similar_builds_index.refresh_build(session, build_id)
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -300,13 +367,128 @@ def add_part_to_build(
         )
 
     build_to_edit.parts.append(part_to_add)
+    bump_build_version(build_to_edit)
     
     session.add(build_to_edit)
     session.commit()
     session.refresh(build_to_edit)
+    similar_builds_index.refresh_build(session, build_id)
 
     return build_to_edit
 
+MAX_BULK_PART_IDS = 500
+
+class SetBuildPartsRequest(BaseModel):
+    part_ids: list[int] = Field(max_length=MAX_BULK_PART_IDS)
+
+class UpdateBuildPartsRequest(BaseModel):
+    add: list[int] = Field(default_factory=list, max_length=MAX_BULK_PART_IDS)
+    remove: list[int] = Field(default_factory=list, max_length=MAX_BULK_PART_IDS)
+
+def get_owned_build_id(session: Session, build_id: int, current_user: User) -> int:
+    owner_id = session.exec(
+        select(Build.user_id)
+        .where(Build.id == build_id)
+    ).first()
+
+    if owner_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Failed to update build parts. Build with id {build_id} not found"
+        )
+
+    if owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Failed to update build parts. You are not the owner of this build"
+        )
+
+    return build_id
+
+def part_ids_param(name: str, part_ids: list[int]):
+    # One array parameter, so the statement is the same for any number of ids
+    return bindparam(name, list(set(part_ids)), type_=ARRAY(Integer))
+
+def link_parts(session: Session, build_id: int, part_ids: list[int]) -> int:
+    if not part_ids:
+        return 0
+
+    # Ids that do not belong to a part are skipped by the SELECT
+    return session.exec(
+        insert(BuildPartLink)
+        .from_select(
+            ["build_id", "part_id"],
+            select(literal(build_id), Part.id)
+            .where(Part.id == any_(part_ids_param("add_ids", part_ids)))
+        )
+        .on_conflict_do_nothing()
+    ).rowcount
+
+def unlink_parts(session: Session, build_id: int, part_ids: list[int]) -> int:
+    if not part_ids:
+        return 0
+
+    return session.exec(
+        delete(BuildPartLink)
+        .where(
+            BuildPartLink.build_id == build_id,
+            BuildPartLink.part_id == any_(part_ids_param("remove_ids", part_ids))
+        )
+    ).rowcount
+
+def finish_build_parts_update(session: Session, build_id: int, added: int, removed: int):
+    if added or removed:
+        session.exec(
+            update(Build)
+            .where(Build.id == build_id)
+            .values(version=Build.version + 1)
+        )
+    session.commit()
+
+    if added or removed:
+        similar_builds_index.refresh_build(session, build_id)
+
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={"build_id": build_id, "added": added, "removed": removed}
+    )
+
+@router.put("/{build_id}/parts")
+def set_build_parts(
+    build_id: int,
+    request: SetBuildPartsRequest,
+    session: SessionDep,
+    current_user: CurrentUserDep
+):
+    """Replace the build's parts with exactly request.part_ids."""
+    get_owned_build_id(session, build_id, current_user)
+
+    removed = session.exec(
+        delete(BuildPartLink)
+        .where(
+            BuildPartLink.build_id == build_id,
+            BuildPartLink.part_id != all_(part_ids_param("keep_ids", request.part_ids))
+        )
+    ).rowcount
+    added = link_parts(session, build_id, request.part_ids)
+
+    return finish_build_parts_update(session, build_id, added, removed)
+
+@router.patch("/{build_id}/parts")
+def update_build_parts(
+    build_id: int,
+    request: UpdateBuildPartsRequest,
+    session: SessionDep,
+    current_user: CurrentUserDep
+):
+    """Add and remove many parts at once; ids already in the wanted state are ignored."""
+    get_owned_build_id(session, build_id, current_user)
+
+    removed = unlink_parts(session, build_id, request.remove)
+    added = link_parts(session, build_id, request.add)
+
+    return finish_build_parts_update(session, build_id, added, removed)
+
 @router.get("/{build_id}/part-categories")
 def get_build_part_categories(
     build_id: int,
@@ -91,6 +91,8 @@ def get_all_post_comments(
 
     all_comments = session.exec(
         select(Comment)
+        # Joining the author leaves out comments by deleted accounts
+        .join(User, Comment.user_id == User.id)
         .where(Comment.post_id == post_id)
         .order_by(Comment.created_at.desc())
         .offset(offset)
@@ -2,8 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.responses import JSONResponse
 from typing import Annotated
 from sqlmodel import select, Session, func
+from pydantic import BaseModel, Field
 from ..database import User, Follow
-from ..models import FollowResponse
+from ..models import FollowResponse, FollowRelationshipResponse, FollowSuggestionResponse, UserResponse
+from ..follow_graph import follow_graph
 from ..dependencies import (
     get_session, get_user_from_cookie, check_resource_exists
 )
@@ -16,6 +18,53 @@ router = APIRouter(
 SessionDep = Annotated[Session, Depends(get_session)]
 CurrentUserDep = Annotated[User, Depends(get_user_from_cookie)]
 
+def get_users_in_order(session: Session, user_ids: list[int]) -> list[User]:
+    # Deleted accounts are left out by the query
+    users = session.exec(
+        select(User)
+        .where(User.id.in_(user_ids))
+    ).all()
+    users_by_id = {user.id: user for user in users}
+
+    return [users_by_id[user_id] for user_id in user_ids if user_id in users_by_id]
+
+class FollowRelationshipsRequest(BaseModel):
+    user_ids: list[int] = Field(min_length=1, max_length=100)
+
+# Whether the current user follows, and is followed by, each of a page of users
+@router.post("/relationships", response_model=list[FollowRelationshipResponse])
+def get_follow_relationships(
+    request: FollowRelationshipsRequest,
+    session: SessionDep,
+    current_user: CurrentUserDep
+):
+    follow_graph.ensure_fresh(
+        session, current_user.id, current_user.following_count, current_user.follower_count
+    )
+
+    return [
+        {"user_id": user_id, "following": following, "followed_by": followed_by}
+        for user_id, following, followed_by in follow_graph.relationships(current_user.id, request.user_ids)
+    ]
+
+# Users followed by the people the current user follows
+@router.get("/suggestions", response_model=list[FollowSuggestionResponse])
+def get_follow_suggestions(
+    session: SessionDep,
+    current_user: CurrentUserDep,
+    limit: Annotated[int, Query(le=50)] = 10,
+):
+    follow_graph.ensure_fresh(
+        session, current_user.id, current_user.following_count, current_user.follower_count
+    )
+
+    # A few extra in case some of them belong to deleted accounts
+    suggestions = follow_graph.suggestions(current_user.id, limit * 2)
+    mutual_counts = dict(suggestions)
+    users = get_users_in_order(session, [user_id for user_id, _ in suggestions])[:limit]
+
+    return [{"mutual_count": mutual_counts[user.id], "user": user} for user in users]
+
 # Follow user
 @router.post("/{user_id}", response_model=FollowResponse)
 def follow_user(
@@ -50,6 +99,7 @@ def follow_user(
     session.add(new_follow)
     session.commit()
     session.refresh(new_follow)
+    follow_graph.follow(current_user.id, user_id)
 
     return new_follow
 
@@ -82,6 +132,7 @@ def unfollow_user(
 
     session.delete(already_following)
     session.commit()
+    follow_graph.unfollow(current_user.id, user_id)
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -103,6 +154,8 @@ def get_all_followers(
 
     all_followers = session.exec(
         select(Follow)
+        # Joining the follower leaves out deleted accounts
+        .join(User, Follow.follower_id == User.id)
         .where(Follow.following_id == user_id)
         .offset(offset)
         .limit(limit)
@@ -116,6 +169,22 @@ def get_all_followers(
         )
     return all_followers
 
+# Show the list of users a user follows
+@router.get("/{user_id}/following", response_model=list[UserResponse])
+def get_all_following(
+    user_id: int,
+    session: SessionDep,
+    offset: int = 0,
+    limit: Annotated[int, Query(le=100)] = 100,
+):
+    # Check if user exists before getting list of followed users
+    user = check_resource_exists(session, User, user_id, "User")
+    follow_graph.ensure_fresh(session, user.id, user.following_count, user.follower_count)
+
+    following_ids = follow_graph.following(user_id)[offset:offset + limit].tolist()
+
+    return get_users_in_order(session, following_ids)
+
 # Show how many followers a user has
 @router.get("/count/{user_id}")
 def get_follower_count(
@@ -123,13 +192,8 @@ def get_follower_count(
     session: SessionDep
 ):
     # Check if user exists before getting follow count 
-    check_resource_exists(session, User, user_id, "User")
+    user = check_resource_exists(session, User, user_id, "User")
 
-    followers = session.exec(
-        select(Follow)
-        .where(Follow.following_id == user_id)
-    ).all()
+    follower_count = user.follower_count
 
-    follower_count = len(followers)
-    
     return{"user_id": user_id, "follower_count": follower_count}
\ No newline at end of file
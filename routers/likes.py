@@ -94,6 +94,8 @@ def get_all_post_likes(
 
     all_likes = session.exec(
         select(Like)
+        # Joining the user leaves out likes by deleted accounts
+        .join(User, Like.user_id == User.id)
         .where(Like.post_id == post_id)
         .order_by(Like.liked_at.desc())
         .offset(offset)
@@ -115,11 +117,8 @@ def get_like_count(
     session: SessionDep
 ):
     # Check if post exists before getting like count on post 
-    check_resource_exists(session, Post, post_id, "Post")
+    post = check_resource_exists(session, Post, post_id, "Post")
 
-    like_count = session.exec(
-        select(func.count())
-        .where(Like.post_id == post_id)
-    ).one()
+    like_count = post.like_count
 
     return{"post_id": post_id, "like_count": like_count}
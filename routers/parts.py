@@ -2,14 +2,16 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.responses import JSONResponse
 from typing import Annotated
 from sqlmodel import select, Session, or_, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, joinedload
 from pydantic import BaseModel
 from datetime import datetime, timezone 
-from ..database import User, PartType, Part, Brand
-from ..models import PartResponse 
+from ..database import User, PartType, Part, Brand, PartBuildCount, normalize_source_url
+from ..models import PartResponse, PopularPartResponse, RelatedPartResponse
+from ..related_parts import related_parts_index, RELATED_PARTS_TOP_K
 from ..dependencies import (
     get_session, get_user_from_cookie, encode_model_to_json
 )
+from ..part_classifier import part_type_classifier
 
 router = APIRouter(
     prefix="/parts",
@@ -159,6 +161,7 @@ class CreateNewPartRequest(BaseModel):
     part_number: str | None = None
     image_url: str | None = None
     description: str | None = None
+    source_url: str | None = None
     
 @router.post("", response_model=PartResponse)
 def create_new_part(
@@ -167,12 +170,16 @@ def create_new_part(
     session: SessionDep
 ):
     request.submitted_by_id = current_user.id
+    request.source_url = normalize_source_url(request.source_url)
     new_part = Part.model_validate(request)
     
     session.add(new_part)
     session.commit()
     session.refresh(new_part)
 
+    # Teach the scrape classifier about the newly catalogued part
+    part_type_classifier.add_example(new_part.id, new_part.type_id, new_part.part_name, new_part.description)
+
     return new_part
 
 @router.get("/query", response_model=list[PartResponse])
@@ -245,6 +252,52 @@ def delete_part_by_part_id(
         }
     )
 
+@router.get("/popular", response_model=list[PopularPartResponse])
+def get_popular_parts(
+    session: SessionDep,
+    offset: int = 0,
+    limit: Annotated[int, Query(le=100)] = 20,
+):
+    rows = session.exec(
+        select(Part, PartBuildCount.build_count)
+        .join(PartBuildCount, PartBuildCount.part_id == Part.id)
+        .where(PartBuildCount.build_count > 0)
+        .options(
+            joinedload(Part.submitted_by), joinedload(Part.brand), joinedload(Part.part_type)
+        )
+        .order_by(PartBuildCount.build_count.desc(), PartBuildCount.part_id.desc())
+        .offset(offset)
+        .limit(limit)
+    ).all()
+
+    return [{"build_count": build_count, "part": part} for part, build_count in rows]
+
+@router.get("/{part_id}/related", response_model=list[RelatedPartResponse])
+def get_related_parts(
+    part_id: int,
+    session: SessionDep,
+    limit: Annotated[int, Query(le=RELATED_PARTS_TOP_K)] = 10,
+):
+    # Recommendations come from memory; only the parts themselves are queried
+    related = related_parts_index.get(part_id, limit)
+    if not related:
+        return []
+
+    parts = session.exec(
+        select(Part)
+        .where(Part.id.in_([related_part_id for related_part_id, _, _ in related]))
+        .options(
+            joinedload(Part.submitted_by), joinedload(Part.brand), joinedload(Part.part_type)
+        )
+    ).all()
+    parts_by_id = {part.id: part for part in parts}
+
+    return [
+        {"co_builds": co_builds, "score": score, "part": parts_by_id[related_part_id]}
+        for related_part_id, co_builds, score in related
+        if related_part_id in parts_by_id
+    ]
+
 @router.get("/{part_id}", response_model=PartResponse)
 def get_part_by_part_id(part_id: int, session: SessionDep):
     part = session.exec(
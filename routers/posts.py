@@ -56,6 +56,8 @@ def get_posts_from_user_id(
 ):
     posts_from_user = session.exec(
         select(Post)
+        # Joining the author leaves out posts of deleted accounts
+        .join(User, Post.user_id == User.id)
         .where(Post.user_id == user_id)
         .order_by(Post.created_at.desc())
         .offset(offset)
@@ -130,6 +132,7 @@ def edit_post(
 def get_post_by_id(post_id: int, session: SessionDep):
     post = session.exec(
         select(Post)
+        .join(User, Post.user_id == User.id)
         .where(Post.id == post_id)
     ).first()
 
@@ -1,17 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from typing import Annotated
-from sqlmodel import select, Session, or_, func
-from sqlalchemy.orm import selectinload
+from sqlmodel import Session, select
 from pydantic import BaseModel
-from bs4 import BeautifulSoup
-from google.genai.errors import ServerError
-import httpx
-import json
-from ..database import User, PartType, Part, Brand
-from ..models import PartLinkResponse 
+from ..database import User, Build
+from ..models import PartLinkResponse, ScrapeJobResponse
 from ..dependencies import (
-    get_session, get_user_from_cookie, encode_model_to_json, get_gemini_client 
+    get_session, get_user_from_cookie
+)
+from ..scraper import scrape_part_link
+from ..scrape_jobs import (
+    create_scrape_job, get_scrape_job, ScrapeJob, SCRAPE_JOB_MAX_URLS
 )
 
 router = APIRouter(
@@ -27,132 +26,105 @@ async def get_data_from_part_page_link(
     session: SessionDep,
     url: str 
 ):
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Accept-Encoding": "gzip, deflate, br",
-        "Connection": "keep-alive",
-    }
-    # Fetch HTML
-    try:
-        async with httpx.AsyncClient(headers=headers) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-    except httpx.HTTPError:
-        raise HTTPException(status_code=400, detail="Unable to fetch page.")
-
-    html = response.text
-
-    # Use Gemini to extract structured data
-    gemini = get_gemini_client()
-    prompt = f"""Extract the following fields from this HTML page:
-    - Brand name
-    - Part name
-    - Part number (if any)
-    - One image URL (if any)
-    - Description
-
-    To expand, the image URL should the link found inside the src attributes of an img element and should
-    end in a .jpg, .png or other image file format. Here is the websites url: {url}
-
-    Take note if the src attribute uses relative pathing, so in that case put the root url before the
-    src link. For example: "https://conceptzperformance.com" and the relative path "/items/33725/original/3.jpg" should 
-    then be "https://conceptzperformance.com/items/33725/original/3.jpg"
-    Respond as a JSON object.
-    Output should be plain text, not in a Markdown code block 
-    Here is an example of how the output should be structured:
-
-    {{
-        "brand": "Borla",
-        "part_name": "2017-2021 Honda Civic Type R Cat-Back Exhaust System ATAK",
-        "part_number": "140738",
-        "image_url": "https://www.borla.com/media/catalog/product/140738/140738-main-1-large.jpg",
-        "description": "This is a description that describes the car part"
-    }}
-
-    - Description must be readable, plain English. 
-    - Remove any non-standard or special characters (like ↕, ♠, ☻, etc).
-    - If the description includes HTML, extract only the clean, human-readable text.
-
-    HTML:
-    {html}""" 
-    
-    try:
-        result = gemini.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=[prompt]
-        )
-    
-    except ServerError as e:
-        print(f"Gemini API error: {e}")
+    return await scrape_part_link(session, url)
+
+class CreateScrapeJobRequest(BaseModel):
+    urls: list[str]
+    build_id: int | None = None
+    auto_create: bool = False
+
+@router.post("/jobs", response_model=ScrapeJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_batch_scrape_job(
+    request: CreateScrapeJobRequest,
+    current_user: CurrentUserDep,
+    session: SessionDep
+):
+    if not request.urls:
         raise HTTPException(
-            status_code=503,
-            detail="The AI model is currently overloaded. Please try again later."
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Failed to create scrape job. List of URLs is empty"
         )
 
-    except Exception as e:
-        print(f"Unexpected error: {e}")
+    if len(request.urls) > SCRAPE_JOB_MAX_URLS:
         raise HTTPException(
-            status_code=500,
-            detail="An unexpected error occurred."
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to create scrape job. A job can contain at most {SCRAPE_JOB_MAX_URLS} URLs"
         )
 
-    print("This is gemini first response ", result.text)
-
-    try:
-        data = result.text.strip("```json").strip("```")  # Clean code block if Gemini returns it
-        parsed = json.loads(data)
-    except Exception as e:
-        print(e)
-        raise HTTPException(status_code=500, detail="Error parsing AI response.")
-
-    # Brand matching
-    brand_name = parsed.get("brand", "").strip().lower()
+    if request.auto_create:
+        if request.build_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Failed to create scrape job. A build id is required to auto create parts"
+            )
+
+        build = session.exec(
+            select(Build)
+            .where(Build.id == request.build_id)
+        ).first()
+
+        if not build:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Failed to create scrape job. Build with id {request.build_id} not found"
+            )
+
+        if build.user_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Failed to create scrape job. You are not the owner of this build"
+            )
+
+    job = create_scrape_job(
+        urls=request.urls,
+        user_id=current_user.id,
+        build_id=request.build_id,
+        auto_create=request.auto_create
+    )
 
-    matched_brand = session.exec(
-        select(Brand).where(func.lower(Brand.name) == brand_name)
-    ).first()
+    return job.to_response()
 
-    if not matched_brand:
-        raise HTTPException(status_code=404, detail="Brand not found in database.")
+def get_job_for_user(job_id: str, current_user: User) -> ScrapeJob:
+    job = get_scrape_job(job_id)
 
-    part_types = session.exec(select(PartType)).all()
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Scrape job with id {job_id} not found"
+        )
 
-    part_type_prompt =  f"""
-        From the following information about a car part, return the part
-        type ID that matchest the best from this list of part types from our database:
-        {part_types}
+    return job
 
-        Your response should be only the part type ID number. Here is the part information:
-        {result.text}
-    """
-    result = gemini.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=[part_type_prompt]
-    )
+@router.get("/jobs/{job_id}", response_model=ScrapeJobResponse)
+async def get_batch_scrape_job(
+    job_id: str,
+    current_user: CurrentUserDep
+):
+    return get_job_for_user(job_id, current_user).to_response()
 
-    # Extract the predicted part type ID from Gemini's response
-    predicted_part_type_id = result.text.strip()
-
-    # Convert the predicted ID from string to int
-    try:
-        predicted_part_type_id = int(predicted_part_type_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid part type ID returned by Gemini.")
-
-    # Query the database for the matched part type using the integer ID
-    matched_type = session.exec(select(PartType).where(PartType.id == predicted_part_type_id)).first()
-
-    # Error handling if no match is found
-    if not matched_type:
-        raise HTTPException(status_code=400, detail="Unable to categorize part type.")
-
-    return PartLinkResponse(
-        brand=matched_brand,
-        type_id=matched_type.id,
-        part_name=parsed.get("part_name"),
-        part_number=parsed.get("part_number"),
-        image_url=parsed.get("image_url"),
-        description=parsed.get("description"),
-    )
\ No newline at end of file
+@router.get("/jobs/{job_id}/stream")
+async def stream_batch_scrape_job(
+    job_id: str,
+    current_user: CurrentUserDep
+):
+    job = get_job_for_user(job_id, current_user)
+
+    async def stream_results():
+        # Emit one NDJSON line per finished URL, then the final job summary
+        sent = 0
+        while True:
+            async with job.condition:
+                await job.condition.wait_for(
+                    lambda: len(job.completion_order) > sent or job.finished
+                )
+
+            while sent < len(job.completion_order):
+                result = job.results[job.completion_order[sent]]
+                yield result.model_dump_json() + "\n"
+                sent += 1
+
+            if job.finished:
+                yield job.to_response().model_dump_json(exclude={"results"}) + "\n"
+                return
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Cookie
 from fastapi.responses import JSONResponse
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlmodel import select, Session, delete, func
 from typing import Annotated
 from sqlmodel import Session
 from pydantic import BaseModel
 from ..database import User, Build, Post, Part, Like, Comment, Follow
-from ..models import UserResponse, UserWithBuildsResponse
-from copy import deepcopy
+from ..models import UserResponse, UserWithBuildsResponse, ProfileResponse
+from ..profiles import get_profile
+from ..purge import tombstone_user
+from ..usernames import username_index
+from sqlalchemy.orm import contains_eager
 from firebase_admin import auth
 from ..dependencies import (
     get_session, check_username_exists, get_user_from_cookie
@@ -53,6 +56,7 @@ def edit_user_me(
                 detail=f"Username '{request.username}' is already taken"
             )
 
+       previous_username = current_user.username
        current_user.username = request.username
 
     if request.bio is not None:
@@ -67,6 +71,10 @@ def edit_user_me(
         session.commit()
         session.refresh(current_user)
 
+        if request.username is not None:
+            username_index.discard(previous_username)
+            username_index.add(current_user.username)
+
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content={
@@ -74,6 +82,13 @@ def edit_user_me(
                 "user": UserResponse.model_validate(current_user).model_dump()
             }
         )
+    except IntegrityError:
+        # Another worker took the name after the availability check
+        session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Username '{request.username}' is already taken"
+        )
     except Exception as e:
         session.rollback()  # Rollback in case of any error
         raise HTTPException(
@@ -87,58 +102,9 @@ def delete_user_me(
     session: SessionDep
 ):
     try:
-        # Delete Likes
-        session.exec(
-            delete(Like)
-            .where(Like.user_id == current_user.id)
-        )
-
-        # Delete Comments 
-        session.exec(
-            delete(Comment)
-            .where(Comment.user_id == current_user.id)
-        )
-
-        # Delete Follows (both as follower and as being followed)
-        session.exec(
-            delete(Follow)
-            .where(Follow.follower_id == current_user.id)
-        )
-        session.exec(
-            delete(Follow)
-            .where(Follow.following_id == current_user.id)
-        )
-
-        # Delete Posts
-        session.exec(
-            delete(Post)
-            .where(Post.user_id == current_user.id)
-        )
-
-        user_builds = session.exec(
-            select(Build)
-            .where(Build.user_id == current_user.id)
-        ).all()
-
-        # Remove all parts from user's builds before deleting builds
-        for build in user_builds:
-            build.parts.clear()
-
-        # Delete Builds
-        session.exec(
-            delete(Build)
-            .where(Build.user_id == current_user.id)
-        )
-
-        # Delete Part submissions
-        session.exec(
-            delete(Part)
-            .where(Part.submitted_by_id == current_user.id)
-        )
-
-        # Delete user from database
-        session.delete(current_user)
-        session.commit()
+        # The account disappears from reads immediately; the purge worker
+        # deletes its content and the Firebase account in the background
+        tombstone_user(session, current_user.id)
 
     except AssertionError as assertion_error:
         session.rollback()
@@ -160,16 +126,7 @@ def delete_user_me(
             status_code=500,
             detail=f"Unexpected error while deleting user: {str(error)}"
         )
-    
-    try:
-        # Delete user from Firebase
-        auth.delete_user(current_user.firebase_uid)
-    except auth.AuthError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to delete user from Firebase: {str(e)}"
-        )
-    
+
     return JSONResponse(
         status_code=status.HTTP_200_OK,
         content={
@@ -227,30 +184,48 @@ def get_users_by_vehicle_owned(
     # Less than or equal to 100; default to 100
     limit: Annotated[int, Query(le=100)] = 100,
 ):
-    users = session.exec(
-        select(User)
-        .join(User.builds)  # Join with the builds relationship
-        .where(Build.vehicle_id == vehicle_id)  # Correctly filter by vehicle_id in builds
+    # Page over distinct owners so offset and limit count users, not builds
+    owner_ids = (
+        select(Build.user_id)
+        .join(User, Build.user_id == User.id)
+        .where(Build.vehicle_id == vehicle_id, User.deleted_at.is_(None))
+        .group_by(Build.user_id)
+        .order_by(Build.user_id)
         .offset(offset)
         .limit(limit)
+        .subquery()
+    )
+
+    # Load the page with only its matching builds populated on user.builds
+    users = session.exec(
+        select(User)
+        .join(owner_ids, owner_ids.c.user_id == User.id)
+        .join(User.builds)
+        .where(Build.vehicle_id == vehicle_id)
+        .options(contains_eager(User.builds))
+        .order_by(User.id, Build.id)
     ).unique().all()
 
-    if users is None:
+    return users
+
+@router.get("/{user_id}/profile", response_model=ProfileResponse)
+async def read_user_profile(
+    user_id: int,
+    # Optional, so signed-out visitors can see profiles too
+    session: Annotated[str | None, Cookie()] = None,
+    limit: Annotated[int, Query(le=50)] = 12,
+):
+    # Everything a profile page shows in one round trip; the session cookie
+    # is verified while the profile is queried
+    profile = await get_profile(user_id, session, limit)
+
+    if profile is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Failed to retrieve users. List is null"
+            detail=f"User with ID {user_id} does not exist"
         )
-    
-    # Build a new list of copied users with filtered builds
-    filtered_user_copies = []
-    for user in users:
-        matching_builds = [b for b in user.builds if b.vehicle_id == vehicle_id]
-        user_copy = deepcopy(user)
-        user_copy.builds = matching_builds
-
-        filtered_user_copies.append(user_copy)
 
-    return filtered_user_copies
+    return profile
 
 @router.get("/{user_id}")
 def read_user_by_id(user_id: int, session: SessionDep):
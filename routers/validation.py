@@ -2,8 +2,9 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.responses import JSONResponse
 from typing import Annotated
 from sqlmodel import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from ..dependencies import check_username_exists, get_session
+from ..usernames import username_index
 
 router = APIRouter(
     tags=["validation"]
@@ -31,4 +32,27 @@ def check_username(
             "message": "Username is available"
         }
     ) 
-   
\ No newline at end of file
+
+class UsernameBatchCheckRequest(BaseModel):
+    usernames: list[str] = Field(min_length=1, max_length=20)
+
+@router.post("/check-usernames")
+def check_usernames(
+    request: UsernameBatchCheckRequest,
+    session: SessionDep
+):
+    taken = username_index.taken_usernames(session, request.usernames)
+
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={
+            "results": [
+                {
+                    "username": username,
+                    "available": username not in taken,
+                    "suggestions": username_index.suggest(username) if username in taken else []
+                }
+                for username in request.usernames
+            ]
+        }
+    )
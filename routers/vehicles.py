@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Annotated
-from sqlmodel import select, Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Annotated, Literal
+from sqlmodel import select, Session, func
+from sqlalchemy.orm import joinedload
 from pydantic import BaseModel
-from ..database import Vehicle
+from ..database import Vehicle, VehicleBuildCount, VehiclePartCount, Part
+from ..models import PopularPartResponse, PopularVehicleResponse
 from ..dependencies import (
     get_session
 )
@@ -31,13 +33,27 @@ def get_years_for_available_cars(session: SessionDep):
     return years
 
 @router.get("/makes/{year}", response_model=list[str])
-def get_makes_from_year(year: int, session: SessionDep):
-    makes = session.exec(
-        select(Vehicle.make)
-        .where(Vehicle.year == year)
-        .order_by(Vehicle.make.asc())
-        .distinct()
-    ).all()
+def get_makes_from_year(
+    year: int,
+    session: SessionDep,
+    sort: Literal["name", "popular"] = "name"
+):
+    if sort == "popular":
+        build_count = func.coalesce(func.sum(VehicleBuildCount.build_count), 0)
+        makes = session.exec(
+            select(Vehicle.make)
+            .outerjoin(VehicleBuildCount, VehicleBuildCount.vehicle_id == Vehicle.id)
+            .where(Vehicle.year == year)
+            .group_by(Vehicle.make)
+            .order_by(build_count.desc(), Vehicle.make.asc())
+        ).all()
+    else:
+        makes = session.exec(
+            select(Vehicle.make)
+            .where(Vehicle.year == year)
+            .order_by(Vehicle.make.asc())
+            .distinct()
+        ).all()
 
     if not makes:
         raise HTTPException(
@@ -48,12 +64,27 @@ def get_makes_from_year(year: int, session: SessionDep):
     return makes
 
 @router.get("/models", response_model=list[Vehicle])
-def get_models_from_year_and_make(year: int, make: str, session: SessionDep):
-    models = session.exec(
+def get_models_from_year_and_make(
+    year: int,
+    make: str,
+    session: SessionDep,
+    sort: Literal["name", "popular"] = "name"
+):
+    statement = (
         select(Vehicle)
         .where(Vehicle.year == year, Vehicle.make == make)
-        .order_by(Vehicle.model.asc())
-    ).all()
+    )
+
+    if sort == "popular":
+        statement = (
+            statement
+            .outerjoin(VehicleBuildCount, VehicleBuildCount.vehicle_id == Vehicle.id)
+            .order_by(func.coalesce(VehicleBuildCount.build_count, 0).desc(), Vehicle.model.asc())
+        )
+    else:
+        statement = statement.order_by(Vehicle.model.asc())
+
+    models = session.exec(statement).all()
 
     if not models:
         raise HTTPException(
@@ -63,6 +94,44 @@ def get_models_from_year_and_make(year: int, make: str, session: SessionDep):
 
     return models
 
+@router.get("/popular", response_model=list[PopularVehicleResponse])
+def get_most_built_vehicles(
+    session: SessionDep,
+    offset: int = 0,
+    limit: Annotated[int, Query(le=100)] = 20,
+):
+    rows = session.exec(
+        select(Vehicle, VehicleBuildCount.build_count)
+        .join(VehicleBuildCount, VehicleBuildCount.vehicle_id == Vehicle.id)
+        .where(VehicleBuildCount.build_count > 0)
+        .order_by(VehicleBuildCount.build_count.desc(), VehicleBuildCount.vehicle_id.desc())
+        .offset(offset)
+        .limit(limit)
+    ).all()
+
+    return [{"build_count": build_count, "vehicle": vehicle} for vehicle, build_count in rows]
+
+@router.get("/{vehicle_id}/popular-parts", response_model=list[PopularPartResponse])
+def get_popular_parts_for_vehicle(
+    vehicle_id: int,
+    session: SessionDep,
+    offset: int = 0,
+    limit: Annotated[int, Query(le=100)] = 20,
+):
+    rows = session.exec(
+        select(Part, VehiclePartCount.build_count)
+        .join(VehiclePartCount, VehiclePartCount.part_id == Part.id)
+        .where(VehiclePartCount.vehicle_id == vehicle_id, VehiclePartCount.build_count > 0)
+        .options(
+            joinedload(Part.submitted_by), joinedload(Part.brand), joinedload(Part.part_type)
+        )
+        .order_by(VehiclePartCount.build_count.desc(), VehiclePartCount.part_id.desc())
+        .offset(offset)
+        .limit(limit)
+    ).all()
+
+    return [{"build_count": build_count, "part": part} for part, build_count in rows]
+
 class GetModelsRequest(BaseModel):
     model: str
     year: int | None = None
@@ -0,0 +1,228 @@
+from fastapi import HTTPException
+from sqlmodel import Session, select
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+from .database import engine, Build, Part, BuildPartLink
+from .models import ScrapeJobResponse, ScrapeJobResultResponse
+from .scraper import fetch_page_html, extract_part_link, find_catalogued_part_link
+from .part_classifier import part_type_classifier
+from .build_details import bump_build_version
+from .similar_builds import similar_builds_index
+import asyncio
+import time
+import uuid
+import os
+
+load_dotenv()
+
+# Maximum number of URLs being scraped at once across all jobs in this worker
+SCRAPE_MAX_WORKERS = int(os.getenv("SCRAPE_MAX_WORKERS", "8"))
+# Maximum number of concurrent fetches against a single vendor domain
+SCRAPE_PER_DOMAIN_CONCURRENCY = int(os.getenv("SCRAPE_PER_DOMAIN_CONCURRENCY", "2"))
+# Minimum gap between the start of two fetches against the same domain
+SCRAPE_DOMAIN_DELAY_SECONDS = float(os.getenv("SCRAPE_DOMAIN_DELAY_SECONDS", "1"))
+SCRAPE_JOB_MAX_URLS = int(os.getenv("SCRAPE_JOB_MAX_URLS", "100"))
+# Finished jobs are kept around this long so callers can collect results
+SCRAPE_JOB_TTL_SECONDS = int(os.getenv("SCRAPE_JOB_TTL_SECONDS", "3600"))
+
+class DomainLimiter:
+    """Caps concurrent fetches per domain and spaces out their start times."""
+
+    def __init__(self):
+        self.semaphore = asyncio.Semaphore(SCRAPE_PER_DOMAIN_CONCURRENCY)
+        self.lock = asyncio.Lock()
+        self.next_start = 0.0
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+
+        async with self.lock:
+            now = time.monotonic()
+            wait = self.next_start - now
+            self.next_start = max(now, self.next_start) + SCRAPE_DOMAIN_DELAY_SECONDS
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.semaphore.release()
+
+class ScrapeJob:
+    def __init__(self, urls: list[str], user_id: int, build_id: int | None, auto_create: bool):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.build_id = build_id
+        self.auto_create = auto_create
+        self.status = "pending"
+        self.error: str | None = None
+        self.created_at = datetime.now(timezone.utc)
+        self.finished_at: float | None = None
+        self.results = [ScrapeJobResultResponse(url=url, status="pending") for url in urls]
+        # Indexes of results in the order they finished, for streaming
+        self.completion_order: list[int] = []
+        self.condition = asyncio.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_response(self) -> ScrapeJobResponse:
+        return ScrapeJobResponse(
+            id=self.id,
+            status=self.status,
+            build_id=self.build_id,
+            auto_create=self.auto_create,
+            total=len(self.results),
+            completed=sum(1 for result in self.results if result.status == "done"),
+            failed=sum(1 for result in self.results if result.status == "failed"),
+            created_at=self.created_at,
+            error=self.error,
+            results=self.results,
+        )
+
+    async def notify(self):
+        async with self.condition:
+            self.condition.notify_all()
+
+scrape_jobs: dict[str, ScrapeJob] = {}
+domain_limiters: dict[str, DomainLimiter] = {}
+worker_semaphore = asyncio.Semaphore(SCRAPE_MAX_WORKERS)
+# Keep references to running tasks so they are not garbage collected
+running_tasks: set[asyncio.Task] = set()
+
+def get_domain_limiter(url: str) -> DomainLimiter:
+    domain = urlsplit(url).hostname or ""
+    if domain not in domain_limiters:
+        domain_limiters[domain] = DomainLimiter()
+
+    return domain_limiters[domain]
+
+def prune_finished_jobs():
+    now = time.monotonic()
+    expired = [
+        job_id for job_id, job in scrape_jobs.items()
+        if job.finished_at is not None and now - job.finished_at > SCRAPE_JOB_TTL_SECONDS
+    ]
+    for job_id in expired:
+        del scrape_jobs[job_id]
+
+def create_scrape_job(urls: list[str], user_id: int, build_id: int | None, auto_create: bool) -> ScrapeJob:
+    prune_finished_jobs()
+
+    job = ScrapeJob(urls, user_id, build_id, auto_create)
+    scrape_jobs[job.id] = job
+
+    task = asyncio.create_task(run_scrape_job(job))
+    running_tasks.add(task)
+    task.add_done_callback(running_tasks.discard)
+
+    return job
+
+def get_scrape_job(job_id: str) -> ScrapeJob | None:
+    return scrape_jobs.get(job_id)
+
+async def run_scrape_job(job: ScrapeJob):
+    job.status = "running"
+
+    await asyncio.gather(*(
+        scrape_job_url(job, index) for index in range(len(job.results))
+    ))
+
+    if job.auto_create and job.build_id is not None:
+        try:
+            await asyncio.to_thread(create_and_link_parts, job)
+        except Exception as e:
+            print(f"Failed to create parts for scrape job {job.id}: {e}")
+            job.error = "Failed to add scraped parts to build."
+
+    job.status = "failed" if job.error else "completed"
+    job.finished_at = time.monotonic()
+    await job.notify()
+
+async def scrape_job_url(job: ScrapeJob, index: int):
+    result = job.results[index]
+
+    async with worker_semaphore:
+        result.status = "running"
+        try:
+            with Session(engine) as session:
+                result.part = find_catalogued_part_link(session, result.url)
+
+            if result.part is None:
+                async with get_domain_limiter(result.url):
+                    html = await fetch_page_html(result.url)
+
+                with Session(engine) as session:
+                    result.part = await extract_part_link(session, result.url, html)
+
+            result.part_id = result.part.part_id
+            result.status = "done"
+        except HTTPException as e:
+            result.status = "failed"
+            result.error = e.detail
+        except Exception as e:
+            print(f"Unexpected error scraping {result.url}: {e}")
+            result.status = "failed"
+            result.error = "An unexpected error occurred."
+
+    job.completion_order.append(index)
+    await job.notify()
+
+def create_and_link_parts(job: ScrapeJob):
+    """Create every successfully scraped part and add it to the build in one transaction."""
+    with Session(engine) as session:
+        build = session.exec(
+            select(Build)
+            .where(Build.id == job.build_id)
+        ).first()
+
+        if not build or build.user_id != job.user_id:
+            job.error = "Build not found or you are not the owner of this build."
+            return
+
+        linked_part_ids = set(session.exec(
+            select(BuildPartLink.part_id)
+            .where(BuildPartLink.build_id == build.id)
+        ).all())
+
+        new_parts = []
+        for result in job.results:
+            if result.status != "done":
+                continue
+
+            # Parts that are already catalogued are linked rather than duplicated
+            if result.part_id is not None:
+                if result.part_id not in linked_part_ids:
+                    session.add(BuildPartLink(build_id=build.id, part_id=result.part_id))
+                    linked_part_ids.add(result.part_id)
+                continue
+
+            new_part = Part(
+                brand_id=result.part.brand.id,
+                type_id=result.part.type_id,
+                submitted_by_id=job.user_id,
+                part_name=result.part.part_name,
+                part_number=result.part.part_number,
+                image_url=result.part.image_url,
+                description=result.part.description,
+                source_url=result.part.source_url,
+            )
+            session.add(new_part)
+            new_parts.append((result, new_part))
+
+        session.flush()
+
+        for result, new_part in new_parts:
+            session.add(BuildPartLink(build_id=build.id, part_id=new_part.id))
+
+        bump_build_version(build)
+        session.add(build)
+        session.commit()
+        similar_builds_index.refresh_build(session, build.id)
+
+        for result, new_part in new_parts:
+            result.part_id = new_part.id
+            part_type_classifier.add_example(
+                new_part.id, new_part.type_id, new_part.part_name, new_part.description
+            )
@@ -0,0 +1,255 @@
+from fastapi import HTTPException
+from sqlmodel import select, Session, func
+import httpx
+import asyncio
+import json
+from .database import PartType, Brand, Part, normalize_part_number, normalize_source_url
+from .models import PartLinkResponse
+from .llm import get_llm_provider, LLMServerError, LLMUnavailableError
+from .http_client import fetch_html, NonHtmlContentError
+from .extractors import (
+    get_domain_extractor, apply_selectors, learn_selectors,
+    record_extractor_result, save_domain_extractor
+)
+from .part_classifier import (
+    part_type_classifier, PART_CLASSIFIER_MIN_SIMILARITY, PART_CLASSIFIER_MIN_MARGIN
+)
+
+async def fetch_page_html(url: str) -> str:
+    try:
+        return await fetch_html(url)
+    except NonHtmlContentError:
+        raise HTTPException(status_code=415, detail="Link does not point to an HTML page.")
+    except httpx.HTTPError:
+        raise HTTPException(status_code=400, detail="Unable to fetch page.")
+
+def part_link_response_from_part(part: Part) -> PartLinkResponse:
+    return PartLinkResponse(
+        brand=Brand.model_validate(part.brand),
+        type_id=part.type_id,
+        part_name=part.part_name,
+        part_number=part.part_number,
+        image_url=part.image_url,
+        description=part.description,
+        source_url=part.source_url,
+        part_id=part.id,
+    )
+
+def find_part_by_source_url(session: Session, url: str) -> Part | None:
+    return session.exec(
+        select(Part)
+        .where(Part.source_url == normalize_source_url(url))
+        .order_by(Part.is_verified.desc(), Part.id.asc())
+    ).first()
+
+def find_part_by_part_number(session: Session, brand_id: int, part_number: str | None) -> Part | None:
+    normalized = normalize_part_number(part_number)
+    if not normalized:
+        return None
+
+    return session.exec(
+        select(Part)
+        .where(Part.brand_id == brand_id, Part.part_number_normalized == normalized)
+        .order_by(Part.is_verified.desc(), Part.id.asc())
+    ).first()
+
+def find_catalogued_part_link(session: Session, url: str) -> PartLinkResponse | None:
+    existing_part = find_part_by_source_url(session, url)
+    if not existing_part:
+        return None
+
+    return part_link_response_from_part(existing_part)
+
+async def scrape_part_link(session: Session, url: str) -> PartLinkResponse:
+    # Skip the fetch and extraction entirely for pages we have already catalogued
+    catalogued = find_catalogued_part_link(session, url)
+    if catalogued:
+        return catalogued
+
+    html = await fetch_page_html(url)
+
+    return await extract_part_link(session, url, html)
+
+async def extract_part_link(session: Session, url: str, html: str) -> PartLinkResponse:
+    parsed = None
+    matched_brand = None
+
+    # Vendors we have seen before can be extracted locally with learned selectors
+    extractor = get_domain_extractor(session, url)
+    if extractor and extractor.selectors:
+        parsed = await asyncio.to_thread(apply_selectors, html, url, extractor.selectors)
+        if parsed:
+            matched_brand = match_brand(session, parsed)
+
+        record_extractor_result(session, extractor, matched_brand is not None)
+
+    if matched_brand is None:
+        parsed = await extract_fields_with_gemini(url, html)
+        matched_brand = match_brand(session, parsed)
+
+        if not matched_brand:
+            raise HTTPException(status_code=404, detail="Brand not found in database.")
+
+        # Learn (or re-learn) selectors for this vendor from the Gemini result
+        selectors = await asyncio.to_thread(learn_selectors, html, url, parsed)
+        save_domain_extractor(session, url, selectors)
+
+    # A known brand and part number means the part is already catalogued
+    existing_part = find_part_by_part_number(session, matched_brand.id, parsed.get("part_number"))
+    if existing_part:
+        return part_link_response_from_part(existing_part)
+
+    # Try the local classifier first and only ask Gemini when it is unsure
+    predicted_part_type_id, similarity, margin = part_type_classifier.predict(
+        parsed.get("part_name"), parsed.get("description")
+    )
+    used_fallback = (
+        predicted_part_type_id is None
+        or similarity < PART_CLASSIFIER_MIN_SIMILARITY
+        or margin < PART_CLASSIFIER_MIN_MARGIN
+    )
+
+    if used_fallback:
+        predicted_part_type_id = await predict_part_type_with_gemini(session, json.dumps(parsed))
+
+    part_type_classifier.record_prediction(used_fallback)
+
+    # Query the database for the matched part type using the integer ID
+    matched_type = session.exec(select(PartType).where(PartType.id == predicted_part_type_id)).first()
+
+    # Error handling if no match is found
+    if not matched_type:
+        raise HTTPException(status_code=400, detail="Unable to categorize part type.")
+
+    return PartLinkResponse(
+        # Copy the brand so the response stays usable once the session is closed
+        brand=Brand.model_validate(matched_brand),
+        type_id=matched_type.id,
+        part_name=parsed.get("part_name"),
+        part_number=parsed.get("part_number"),
+        image_url=parsed.get("image_url"),
+        description=parsed.get("description"),
+        source_url=normalize_source_url(url),
+    )
+
+def match_brand(session: Session, parsed: dict) -> Brand | None:
+    brand_name = (parsed.get("brand") or "").strip().lower()
+
+    return session.exec(
+        select(Brand).where(func.lower(Brand.name) == brand_name)
+    ).first()
+
+async def extract_fields_with_gemini(url: str, html: str) -> dict:
+    # Use Gemini to extract structured data
+    prompt = f"""Extract the following fields from this HTML page:
+    - Brand name
+    - Part name
+    - Part number (if any)
+    - One image URL (if any)
+    - Description
+
+    To expand, the image URL should the link found inside the src attributes of an img element and should
+    end in a .jpg, .png or other image file format. Here is the websites url: {url}
+
+    Take note if the src attribute uses relative pathing, so in that case put the root url before the
+    src link. For example: "https://conceptzperformance.com" and the relative path "/items/33725/original/3.jpg" should 
+    then be "https://conceptzperformance.com/items/33725/original/3.jpg"
+    Respond as a JSON object.
+    Output should be plain text, not in a Markdown code block 
+    Here is an example of how the output should be structured:
+
+    {{
+        "brand": "Borla",
+        "part_name": "2017-2021 Honda Civic Type R Cat-Back Exhaust System ATAK",
+        "part_number": "140738",
+        "image_url": "https://www.borla.com/media/catalog/product/140738/140738-main-1-large.jpg",
+        "description": "This is a description that describes the car part"
+    }}
+
+    - Description must be readable, plain English. 
+    - Remove any non-standard or special characters (like ↕, ♠, ☻, etc).
+    - If the description includes HTML, extract only the clean, human-readable text.
+
+    HTML:
+    {html}""" 
+    
+    try:
+        result = await get_llm_provider().generate(prompt)
+    
+    except LLMUnavailableError as e:
+        print(f"AI model unavailable: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="The AI model is temporarily unavailable. Please try again later."
+        )
+
+    except LLMServerError as e:
+        print(f"AI model error: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="The AI model is currently overloaded. Please try again later."
+        )
+
+    except asyncio.TimeoutError:
+        print("AI model call timed out")
+        raise HTTPException(
+            status_code=504,
+            detail="The AI model took too long to respond. Please try again later."
+        )
+
+    except Exception as e:
+        print(f"Unexpected error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="An unexpected error occurred."
+        )
+
+    print("This is gemini first response ", result)
+
+    try:
+        data = result.strip("```json").strip("```")  # Clean code block if Gemini returns it
+        return json.loads(data)
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail="Error parsing AI response.")
+
+async def predict_part_type_with_gemini(session: Session, part_information: str) -> int:
+    part_types = session.exec(select(PartType)).all()
+
+    part_type_prompt =  f"""
+        From the following information about a car part, return the part
+        type ID that matchest the best from this list of part types from our database:
+        {part_types}
+
+        Your response should be only the part type ID number. Here is the part information:
+        {part_information}
+    """
+    try:
+        result = await get_llm_provider().generate(part_type_prompt)
+
+    except LLMUnavailableError as e:
+        print(f"AI model unavailable: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="The AI model is temporarily unavailable. Please try again later."
+        )
+
+    except LLMServerError as e:
+        print(f"AI model error: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="The AI model is currently overloaded. Please try again later."
+        )
+
+    except asyncio.TimeoutError:
+        print("AI model call timed out")
+        raise HTTPException(
+            status_code=504,
+            detail="The AI model took too long to respond. Please try again later."
+        )
+
+    # Convert the predicted ID from string to int
+    try:
+        return int(result.strip())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid part type ID returned by Gemini.")
@@ -0,0 +1,217 @@
+from sqlmodel import Session, select
+from sqlalchemy import text
+from collections import Counter, defaultdict
+from datetime import timedelta
+from dotenv import load_dotenv
+from .database import engine, Build, BuildPartLink
+import numpy as np
+import threading
+import time
+import os
+
+load_dotenv()
+
+# How often each worker picks up builds changed through other workers
+SIMILAR_BUILDS_REFRESH_SECONDS = float(os.getenv("SIMILAR_BUILDS_REFRESH_SECONDS", "60"))
+# Changes re-read on every sync, so one stamped before the previous sync but
+# committed after it is still picked up
+BUILD_CHANGE_OVERLAP = timedelta(minutes=5)
+# Candidates scored per query, taken from the builds sharing the most LSH bands
+SIMILAR_BUILDS_MAX_CANDIDATES = int(os.getenv("SIMILAR_BUILDS_MAX_CANDIDATES", "500"))
+
+# 32 bands of 4 hashes: builds with a Jaccard similarity of 0.5 share a
+# band with probability ~0.87, builds at 0.2 with probability ~0.05
+MINHASH_BANDS = 32
+MINHASH_ROWS_PER_BAND = 4
+MINHASH_PERMUTATIONS = MINHASH_BANDS * MINHASH_ROWS_PER_BAND
+
+# Universal hashes h(x) = (a * x + b) mod p; p < 2^31 keeps a * x within int64
+MINHASH_PRIME = 2_147_483_647
+# Fixed seed so every worker computes the same signatures
+MINHASH_SEED = 7_411
+
+class SimilarBuildsIndex:
+    """
+    MinHash signature of every build's part set, bucketed by LSH band. A
+    query only scores builds that share a band with the queried one, so its
+    cost depends on bucket sizes rather than on the number of builds.
+    """
+
+    def __init__(self):
+        rng = np.random.default_rng(MINHASH_SEED)
+        self.hash_a = rng.integers(1, MINHASH_PRIME, MINHASH_PERMUTATIONS, dtype=np.int64)
+        self.hash_b = rng.integers(0, MINHASH_PRIME, MINHASH_PERMUTATIONS, dtype=np.int64)
+
+        self.signatures: dict[int, np.ndarray] = {}
+        self.vehicle_ids: dict[int, int] = {}
+        # Build versions the index reflects, including builds without parts
+        self.versions: dict[int, int] = {}
+        self.buckets: list[dict[bytes, set[int]]] = [defaultdict(set) for _ in range(MINHASH_BANDS)]
+        # Latest buildchange stamp seen; None until the first full sync
+        self.changes_seen_at = None
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+
+    def signature(self, part_ids: np.ndarray) -> np.ndarray:
+        hashes = (self.hash_a[:, None] * (part_ids[None, :] % MINHASH_PRIME) + self.hash_b[:, None]) % MINHASH_PRIME
+        return hashes.min(axis=1)
+
+    def band_keys(self, signature: np.ndarray) -> list[bytes]:
+        return [
+            signature[band * MINHASH_ROWS_PER_BAND:(band + 1) * MINHASH_ROWS_PER_BAND].tobytes()
+            for band in range(MINHASH_BANDS)
+        ]
+
+    def remove(self, build_id: int):
+        # Caller holds self.lock
+        signature = self.signatures.pop(build_id, None)
+        if signature is not None:
+            for band, key in enumerate(self.band_keys(signature)):
+                bucket = self.buckets[band][key]
+                bucket.discard(build_id)
+                if not bucket:
+                    del self.buckets[band][key]
+
+        self.vehicle_ids.pop(build_id, None)
+        self.versions.pop(build_id, None)
+
+    def put(self, build_id: int, vehicle_id: int, version: int, part_ids: list[int]):
+        signature = self.signature(np.array(part_ids, dtype=np.int64)) if part_ids else None
+
+        with self.lock:
+            # A sync that read the build before a newer refresh_build must not undo it
+            if self.versions.get(build_id, version) > version:
+                return
+
+            self.remove(build_id)
+            self.versions[build_id] = version
+            if signature is None:
+                return
+
+            self.signatures[build_id] = signature
+            self.vehicle_ids[build_id] = vehicle_id
+            for band, key in enumerate(self.band_keys(signature)):
+                self.buckets[band][key].add(build_id)
+
+    def discard(self, build_id: int):
+        with self.lock:
+            self.remove(build_id)
+
+    def version_of(self, build_id: int) -> int | None:
+        return self.versions.get(build_id)
+
+    def sync(self):
+        """
+        Re-index builds whose version changed and drop deleted ones. The first
+        sync reads every build; later ones only the builds in buildchange
+        stamped since the previous sync.
+        """
+        with self.load_lock:
+            start = time.perf_counter()
+            full = self.changes_seen_at is None
+
+            with engine.connect() as connection:
+                if full:
+                    # Read before the builds, so changes made meanwhile are seen next time
+                    changes_seen_at = connection.execute(text(
+                        "SELECT coalesce(max(changed_at), now() AT TIME ZONE 'UTC') FROM buildchange"
+                    )).scalar()
+                    builds = connection.execute(text("SELECT id, vehicle_id, version FROM build")).all()
+
+                    current_ids = {build.id for build in builds}
+                    deleted = [build_id for build_id in list(self.versions) if build_id not in current_ids]
+                else:
+                    changes = connection.execute(
+                        text(
+                            "SELECT c.build_id AS id, b.vehicle_id, b.version, c.changed_at "
+                            "FROM buildchange c LEFT JOIN build b ON b.id = c.build_id "
+                            "WHERE c.changed_at > :since"
+                        ),
+                        {"since": self.changes_seen_at - BUILD_CHANGE_OVERLAP}
+                    ).all()
+                    changes_seen_at = max([self.changes_seen_at, *(change.changed_at for change in changes)])
+
+                    builds = [change for change in changes if change.version is not None]
+                    deleted = [
+                        change.id for change in changes
+                        if change.version is None and change.id in self.versions
+                    ]
+
+                changed = [build for build in builds if self.versions.get(build.id) != build.version]
+
+                # The first sync reads every link; later ones only those of changed builds
+                if full:
+                    links = connection.execute(text("SELECT build_id, part_id FROM buildpartlink")).all()
+                elif changed:
+                    links = connection.execute(
+                        text("SELECT build_id, part_id FROM buildpartlink WHERE build_id = ANY(:ids)"),
+                        {"ids": [build.id for build in changed]}
+                    ).all()
+                else:
+                    links = []
+
+            part_ids = defaultdict(list)
+            for build_id, part_id in links:
+                part_ids[build_id].append(part_id)
+
+            for build in changed:
+                self.put(build.id, build.vehicle_id, build.version, part_ids[build.id])
+            for build_id in deleted:
+                self.discard(build_id)
+
+            self.changes_seen_at = changes_seen_at
+
+            if changed or deleted:
+                print(
+                    f"Indexed {len(changed)} changed and dropped {len(deleted)} deleted builds "
+                    f"for similar builds in {time.perf_counter() - start:.2f}s"
+                )
+
+    def refresh_build(self, session: Session, build_id: int):
+        """Re-index one build from the database, e.g. right after its parts changed."""
+        build = session.exec(
+            select(Build.vehicle_id, Build.version)
+            .where(Build.id == build_id)
+        ).first()
+
+        if build is None:
+            self.discard(build_id)
+            return
+
+        part_ids = session.exec(
+            select(BuildPartLink.part_id)
+            .where(BuildPartLink.build_id == build_id)
+        ).all()
+        self.put(build_id, build.vehicle_id, build.version, list(part_ids))
+
+    def similar(self, build_id: int, limit: int, same_vehicle: bool = False) -> list[tuple[int, float]]:
+        """(build_id, estimated Jaccard similarity) of the closest builds, best first."""
+        with self.lock:
+            signature = self.signatures.get(build_id)
+            if signature is None:
+                return []
+
+            vehicle_id = self.vehicle_ids[build_id]
+            band_hits = Counter()
+            for band, key in enumerate(self.band_keys(signature)):
+                band_hits.update(self.buckets[band].get(key, ()))
+            del band_hits[build_id]
+
+            if same_vehicle:
+                band_hits = Counter({
+                    candidate: hits for candidate, hits in band_hits.items()
+                    if self.vehicle_ids[candidate] == vehicle_id
+                })
+
+            candidates = [candidate for candidate, _ in band_hits.most_common(SIMILAR_BUILDS_MAX_CANDIDATES)]
+            if not candidates:
+                return []
+
+            candidate_signatures = np.stack([self.signatures[candidate] for candidate in candidates])
+
+        similarities = (candidate_signatures == signature).mean(axis=1)
+        top = np.argsort(-similarities, kind="stable")[:limit]
+
+        return [(candidates[i], float(similarities[i])) for i in top]
+
+similar_builds_index = SimilarBuildsIndex()
@@ -0,0 +1,50 @@
+from typing import Callable
+import asyncio
+
+# Background loops started at app startup, keyed by name
+periodic_tasks: dict[str, asyncio.Task] = {}
+
+async def run_periodically(
+    name: str, interval_seconds: float, func: Callable[[], object], run_immediately: bool
+):
+    while True:
+        if not run_immediately:
+            await asyncio.sleep(interval_seconds)
+        run_immediately = False
+
+        try:
+            # Tasks do blocking database work, so keep them off the event loop
+            await asyncio.to_thread(func)
+        except Exception as e:
+            print(f"Periodic task {name} failed: {e!r}")
+
+def start_periodic_task(
+    name: str, interval_seconds: float, func: Callable[[], object], run_immediately: bool = False
+):
+    """Run func in a worker thread every interval_seconds until shutdown."""
+    if name in periodic_tasks:
+        return
+
+    periodic_tasks[name] = asyncio.create_task(
+        run_periodically(name, interval_seconds, func, run_immediately)
+    )
+
+async def run_once(name: str, func: Callable[[], object]):
+    try:
+        await asyncio.to_thread(func)
+    except Exception as e:
+        print(f"Background task {name} failed: {e!r}")
+
+def start_background_task(name: str, func: Callable[[], object]):
+    """Run func once in a worker thread, cancelled on shutdown if still running."""
+    if name in periodic_tasks:
+        return
+
+    periodic_tasks[name] = asyncio.create_task(run_once(name, func))
+
+async def stop_periodic_tasks():
+    for task in periodic_tasks.values():
+        task.cancel()
+
+    await asyncio.gather(*periodic_tasks.values(), return_exceptions=True)
+    periodic_tasks.clear()
@@ -0,0 +1,112 @@
+from sqlmodel import Session, select
+from dotenv import load_dotenv
+from .database import engine, User
+import threading
+import time
+import os
+
+load_dotenv()
+
+# How often each worker reloads usernames taken through other workers. Each
+# reload reads the whole user table, and staleness only affects the hint
+USERNAME_INDEX_REFRESH_SECONDS = float(os.getenv("USERNAME_INDEX_REFRESH_SECONDS", "600"))
+# Suggestions offered for each taken name in a batch check
+USERNAME_SUGGESTION_COUNT = 3
+
+class UsernameIndex:
+    """
+    In-memory set of every username in use, including tombstoned accounts
+    that still hold theirs. A name missing from the set is available without
+    asking Postgres; a name in the set is confirmed with a lookup, because it
+    may have been released by another worker since the last refresh.
+
+    Availability is a best-effort hint: a name taken through another worker
+    since the last refresh reads as available until then. Signup and username
+    changes still rely on the unique constraint, so such a name is rejected
+    when it is actually claimed.
+    """
+
+    def __init__(self):
+        self.usernames: set[str] = set()
+        self.loaded = False
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        # Names added while a reload is running, merged into the new set
+        self.added_during_load: set[str] | None = None
+
+    def load(self):
+        with self.load_lock:
+            self.load_usernames()
+
+    def load_usernames(self):
+        start = time.perf_counter()
+
+        with self.lock:
+            self.added_during_load = set()
+
+        with Session(engine) as session:
+            usernames = set(session.exec(
+                select(User.username)
+                .execution_options(include_deleted=True, yield_per=10_000)
+            ))
+
+        # Swap the whole set so readers never see a partial load
+        with self.lock:
+            usernames |= self.added_during_load
+            self.added_during_load = None
+            self.usernames = usernames
+            self.loaded = True
+
+        print(f"Loaded {len(usernames)} usernames in {time.perf_counter() - start:.2f}s")
+
+    def ensure_loaded(self):
+        if self.loaded:
+            return
+
+        with self.load_lock:
+            if not self.loaded:
+                self.load_usernames()
+
+    def add(self, username: str):
+        with self.lock:
+            self.usernames.add(username)
+            if self.added_during_load is not None:
+                self.added_during_load.add(username)
+
+    def discard(self, username: str):
+        with self.lock:
+            self.usernames.discard(username)
+
+    def might_exist(self, username: str) -> bool:
+        self.ensure_loaded()
+        return username in self.usernames
+
+    def taken_usernames(self, session: Session, usernames: list[str]) -> set[str]:
+        """Return which of usernames are taken, querying only the possible matches."""
+        candidates = [username for username in usernames if self.might_exist(username)]
+        if not candidates:
+            return set()
+
+        return set(session.exec(
+            select(User.username)
+            .where(User.username.in_(candidates))
+            .execution_options(include_deleted=True)
+        ).all())
+
+    def suggest(self, username: str, count: int = USERNAME_SUGGESTION_COUNT) -> list[str]:
+        """Available variants of username; only names absent from the index are offered."""
+        suggestions = []
+        suffix = 1
+
+        while len(suggestions) < count:
+            for candidate in (f"{username}{suffix}", f"{username}_{suffix}"):
+                if len(suggestions) < count and not self.might_exist(candidate):
+                    suggestions.append(candidate)
+            suffix += 1
+
+        return suggestions
+
+username_index = UsernameIndex()
+
+def is_username_taken(username: str, session: Session) -> bool:
+    return username in username_index.taken_usernames(session, [username])